@@ -0,0 +1,21 @@
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+from send_scheduler import RATE_LIMITED_METHODS, OutboundScheduler, bot_key, outbound
+
+
+class AiogramRateLimitMiddleware(BaseRequestMiddleware):
+    """Middleware сессии aiogram поверх общего планировщика.
+
+    Подключается через bot.session.middleware(...).
+    """
+
+    def __init__(self, scheduler: OutboundScheduler = outbound):
+        self.scheduler = scheduler
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, "chat_id", None)
+        api_method = getattr(method, "__api_method__", "")
+        if chat_id is None or api_method.lower() not in RATE_LIMITED_METHODS:
+            return await make_request(bot, method)
+        # Тот же ключ, что и у PTBRateLimiter: у бота с одним токеном общий лимит в любом адаптере
+        return await self.scheduler.submit(bot_key(bot.token), chat_id, lambda: make_request(bot, method))
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import random
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from http_client import fetch_json
+
+logger = logging.getLogger(__name__)
+
+APOD_URL = "https://api.nasa.gov/planetary/apod"
+# Первый выпуск APOD
+APOD_FIRST_DATE = date(1995, 6, 16)
+# Размер диапазона дат в одном запросе при массовой загрузке
+BACKFILL_CHUNK_DAYS = 90
+
+
+# Последний день, который API точно отдает. NASA считает дни по времени США (UTC-5/UTC-4)
+# и отклоняет весь диапазон, если end_date позже его текущего дня, поэтому локальная дата
+# сервера восточнее США не подходит. Вчерашний день по UTC не позже текущего дня NASA.
+def latest_apod_date() -> date:
+    return datetime.now(timezone.utc).date() - timedelta(days=1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS apod (
+    date TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    url TEXT,
+    hdurl TEXT,
+    media_type TEXT NOT NULL,
+    file_id TEXT,
+    fetched_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class ApodArchive:
+    """Локальный архив Astronomy Picture of the Day.
+
+    Все полученные записи (включая видео) хранятся в SQLite, чтобы не запрашивать их
+    повторно; картинки дополнительно держатся в памяти списком для выбора за O(1).
+    После первой отправки для записи сохраняется file_id Telegram.
+    """
+
+    def __init__(self, api_key: str, db_path: str = "apod.db"):
+        self.api_key = api_key
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+        self._images = []
+        self._positions = {}
+        for row in self._conn.execute(
+            "SELECT date, title, url, file_id FROM apod WHERE media_type = 'image' AND url IS NOT NULL"
+        ):
+            self._add_image(*row)
+
+    def __len__(self):
+        return len(self._images)
+
+    def _add_image(self, day: str, title: str, url: str, file_id) -> None:
+        entry = {"date": day, "title": title, "url": url, "file_id": file_id}
+        position = self._positions.get(day)
+        if position is None:
+            self._positions[day] = len(self._images)
+            self._images.append(entry)
+        else:
+            self._images[position] = entry
+
+    def random_entry(self):
+        if not self._images:
+            return None
+        return random.choice(self._images)
+
+    def known_dates(self) -> set:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT date FROM apod")}
+
+    def _store(self, items) -> int:
+        rows = [
+            (item["date"], item.get("title", ""), item.get("url"), item.get("hdurl"),
+             item.get("media_type", ""), time.time())
+            for item in items
+            if item.get("date")
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO apod (date, title, url, hdurl, media_type, fetched_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (date) DO UPDATE SET
+                    title = excluded.title, url = excluded.url, hdurl = excluded.hdurl,
+                    media_type = excluded.media_type, fetched_at = excluded.fetched_at
+                """,
+                rows,
+            )
+        for day, title, url, _, media_type, _ in rows:
+            # Видео и прочие не-картинки не попадают в выборку: answer_photo их не отправит
+            if media_type == "image" and url:
+                position = self._positions.get(day)
+                file_id = self._images[position]["file_id"] if position is not None else None
+                self._add_image(day, title, url, file_id)
+        return len(rows)
+
+    def _save_file_id(self, day: str, file_id) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE apod SET file_id = ? WHERE date = ?", (file_id, day))
+
+    async def set_file_id(self, day: str, file_id) -> None:
+        position = self._positions.get(day)
+        if position is not None:
+            self._images[position]["file_id"] = file_id
+        await asyncio.to_thread(self._save_file_id, day, file_id)
+
+    # Один запрос за диапазон дат (start_date/end_date)
+    async def fetch_range(self, start: date, end: date) -> int:
+        params = {
+            "api_key": self.api_key,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+        }
+        items = await fetch_json(APOD_URL, params=params, timeout=30)
+        if isinstance(items, dict):
+            items = [items]
+        return await asyncio.to_thread(self._store, items)
+
+    # Массовая загрузка архива за последние years лет; уже загруженные диапазоны пропускаются
+    async def backfill(self, years: int, pause: float = 1.0) -> int:
+        latest = latest_apod_date()
+        start = max(APOD_FIRST_DATE, latest - timedelta(days=365 * years))
+        known = await asyncio.to_thread(self.known_dates)
+        total = 0
+        chunk_end = latest
+        while chunk_end >= start:
+            chunk_start = max(start, chunk_end - timedelta(days=BACKFILL_CHUNK_DAYS - 1))
+            days = (chunk_end - chunk_start).days + 1
+            if any((chunk_start + timedelta(days=i)).isoformat() not in known for i in range(days)):
+                try:
+                    total += await self.fetch_range(chunk_start, chunk_end)
+                except Exception as e:
+                    logger.warning(f"APOD: не удалось загрузить {chunk_start}..{chunk_end}: {e}")
+                await asyncio.sleep(pause)
+            chunk_end = chunk_start - timedelta(days=1)
+        logger.info(f"APOD: загружено {total} записей, картинок в архиве: {len(self)}")
+        return total
+
+    # Ежедневное пополнение: последние несколько дней одним запросом
+    async def top_up(self, days: int = 7) -> int:
+        latest = latest_apod_date()
+        return await self.fetch_range(latest - timedelta(days=days - 1), latest)
+
+    def close(self) -> None:
+        self._conn.close()
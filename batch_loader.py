@@ -0,0 +1,75 @@
+import asyncio
+
+
+class BatchLoader:
+    """Пакетная загрузка по ключам в стиле DataLoader.
+
+    Ключи, запрошенные в пределах window секунд, загружаются одним вызовом load_many.
+    Повторный запрос ключа, который уже ждет загрузки, получает тот же future.
+    load_many(keys) -> корутина со словарем {ключ: значение}; отсутствующие ключи получают None.
+    """
+
+    def __init__(self, load_many, window: float = 0.01, max_batch: int = 50):
+        self.load_many = load_many
+        self.window = window
+        self.max_batch = max_batch
+        self._batch = {}
+        self._inflight = {}
+        self._flush_handle = None
+        # Ссылки на выполняющиеся загрузки: задачу без ссылок может удалить сборщик мусора
+        self._tasks = set()
+        self.calls = 0
+        self.batches = 0
+        self.loaded = 0
+
+    async def load(self, key):
+        self.calls += 1
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._batch[key] = future
+            if len(self._batch) >= self.max_batch:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = asyncio.get_running_loop().call_later(self.window, self._flush)
+        # shield: отмена одного ожидающего не отменяет загрузку для остальных
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, {}
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: dict) -> None:
+        self.batches += 1
+        self.loaded += len(batch)
+        try:
+            results = await self.load_many(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Исключение считается полученным, даже если все ожидающие уже отменены
+                    future.exception()
+        else:
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(results.get(key))
+        finally:
+            for key, future in batch.items():
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "batches": self.batches,
+            "loaded": self.loaded,
+            "pending": len(self._batch),
+        }
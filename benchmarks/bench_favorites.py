@@ -0,0 +1,101 @@
+"""Бенчмарк избранного: чтение списка пользователя и пакетная запись при миллионах строк.
+
+Запуск: python benchmarks/bench_favorites.py --rows 2000000 --users 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from favorites import FavoritesStore  # noqa: E402
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def fill(store: FavoritesStore, rows: int, users: int) -> float:
+    started = time.perf_counter()
+    conn = store._writer
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT OR IGNORE INTO users (user_id) VALUES (?)",
+        ((user_id,) for user_id in range(users)),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO user_favorites (user_id, series_id, series_name, added_at) VALUES (?, ?, ?, ?)",
+        (
+            (i % users, i, f"Сериал {i}", float(i))
+            for i in range(rows)
+        ),
+    )
+    conn.execute("COMMIT")
+    return time.perf_counter() - started
+
+
+async def bench_list(store: FavoritesStore, users: int, queries: int) -> list:
+    timings = []
+    for _ in range(queries):
+        user_id = random.randrange(users)
+        started = time.perf_counter()
+        await store.list(user_id)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def bench_writes(store: FavoritesStore, users: int, writes: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        store.add(random.randrange(users), 10_000_000 + i, f"Новый {i}")
+        for i in range(writes)
+    ))
+    return time.perf_counter() - started
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--writes", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FavoritesStore(os.path.join(tmp, "bench.db"))
+
+        fill_time = fill(store, args.rows, args.users)
+        print(f"Заполнение: {args.rows} строк за {fill_time:.1f} с")
+
+        plan = store._reader.execute(
+            "EXPLAIN QUERY PLAN SELECT series_id, series_name FROM user_favorites "
+            "WHERE user_id = ? ORDER BY added_at DESC LIMIT 50",
+            (1,),
+        ).fetchall()
+        print("План запроса:", "; ".join(row[-1] for row in plan))
+
+        timings = await bench_list(store, args.users, args.queries)
+        print(
+            f"Список избранного ({args.queries} запросов): "
+            f"медиана {statistics.median(timings):.3f} мс, "
+            f"p99 {percentile(timings, 0.99):.3f} мс, "
+            f"макс {max(timings):.3f} мс"
+        )
+
+        write_time = await bench_writes(store, args.users, args.writes)
+        print(
+            f"Запись: {args.writes} добавлений за {write_time:.2f} с "
+            f"({args.writes / write_time:.0f}/с, транзакций: {store.batches})"
+        )
+        await store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""Бенчмарк поиска похожих фото по dHash в индексе на миллион записей и вычисления dHash одного фото.
+
+Запуск: python benchmarks/bench_phash.py --size 1000000 --queries 200
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from phash_index import PerceptualIndex, dhash  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-distance", type=int, default=8)
+    parser.add_argument("--photo-size", type=int, nargs=2, default=(1280, 960))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    values = rng.integers(0, np.iinfo(np.uint64).max, size=args.size, dtype=np.uint64, endpoint=True)
+
+    index = PerceptualIndex(capacity=args.size)
+    started = time.perf_counter()
+    for i, value in enumerate(values.tolist()):
+        index.add(i, value)
+    print(f"Заполнение: {args.size} хэшей за {time.perf_counter() - started:.1f} с, "
+          f"массив {index._hashes.nbytes / 1024 ** 2:.1f} МБ")
+
+    timings = []
+    found = 0
+    for value in rng.choice(values, size=args.queries).tolist():
+        # Запрос — существующий хэш с несколькими измененными битами (как после пережатия)
+        noisy = value ^ (1 << int(rng.integers(64))) ^ (1 << int(rng.integers(64)))
+        started = time.perf_counter()
+        matches = index.search(noisy, args.max_distance)
+        timings.append((time.perf_counter() - started) * 1000)
+        found += bool(matches)
+
+    timings.sort()
+    print(
+        f"Поиск ({args.queries} запросов): медиана {statistics.median(timings):.2f} мс, "
+        f"p99 {timings[int(len(timings) * 0.99) - 1]:.2f} мс, найдено {found}/{args.queries}"
+    )
+
+    # dHash одного JPEG такого же размера, как фото из Telegram (выполняется в пуле процессов бота)
+    from PIL import Image
+
+    width, height = args.photo_size
+    pixels = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "photo.jpg"
+        Image.fromarray(pixels).save(path, quality=85)
+        hash_timings = []
+        for _ in range(20):
+            started = time.perf_counter()
+            dhash(path)
+            hash_timings.append((time.perf_counter() - started) * 1000)
+    print(f"dHash фото {width}x{height}: медиана {statistics.median(hash_timings):.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Бенчмарк проекции полей Кинопоиска: объем ответа, время разбора и память записи в кэше.
+
+Сравнивается полный документ /movie/{id}, ответ с selectFields и запись Series.
+Документы синтетические, по структуре и размеру близкие к реальным ответам API.
+
+Запуск: python benchmarks/bench_series_records.py --entries 2000 --persons 120
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from series_record import SERIES_FIELDS, Series  # noqa: E402
+
+PROFESSIONS = [("actor", "актеры"), ("director", "режиссеры"), ("writer", "сценаристы"),
+               ("producer", "продюсеры"), ("composer", "композиторы"), ("operator", "операторы")]
+
+
+def full_document(series_id: int, persons: int) -> dict:
+    rnd = random.Random(series_id)
+    return {
+        "id": series_id,
+        "name": f"Сериал {series_id}",
+        "alternativeName": f"Series {series_id}",
+        "enName": None,
+        "names": [{"name": f"Сериал {series_id}"}, {"name": f"Series {series_id}", "language": "US"}],
+        "type": "tv-series",
+        "typeNumber": 2,
+        "year": rnd.randint(1990, 2024),
+        "description": "Описание сюжета. " * 40,
+        "shortDescription": "Краткое описание сериала.",
+        "slogan": "Слоган сериала",
+        "status": "completed",
+        "rating": {"kp": rnd.uniform(5, 9), "imdb": rnd.uniform(5, 9), "filmCritics": 0, "russianFilmCritics": 0},
+        "votes": {"kp": rnd.randint(1000, 900000), "imdb": rnd.randint(1000, 900000), "filmCritics": 0},
+        "movieLength": None,
+        "seriesLength": 50,
+        "ageRating": 16,
+        "poster": {"url": f"https://image.openmoviedb.com/kinopoisk-images/{series_id}/orig",
+                   "previewUrl": f"https://image.openmoviedb.com/kinopoisk-images/{series_id}/x1000"},
+        "backdrop": {"url": f"https://image.openmoviedb.com/backdrops/{series_id}/orig", "previewUrl": None},
+        "genres": [{"name": "драма"}, {"name": "криминал"}, {"name": "триллер"}, {"name": "детектив"}],
+        "countries": [{"name": "США"}, {"name": "Великобритания"}],
+        "persons": [
+            {
+                "id": series_id * 1000 + i,
+                "photo": f"https://image.openmoviedb.com/kinopoisk-st-images/actor_iphone/iphone360_{i}.jpg",
+                "name": f"Персона {i}",
+                "enName": f"Person {i}",
+                "description": f"Роль {i}" if i % 3 == 0 else None,
+                "profession": PROFESSIONS[i % len(PROFESSIONS)][1],
+                "enProfession": PROFESSIONS[i % len(PROFESSIONS)][0],
+            }
+            for i in range(persons)
+        ],
+        "facts": [{"value": "Интересный факт о съемках. " * 5, "type": "FACT", "spoiler": False} for _ in range(15)],
+        "videos": {"trailers": [{"url": f"https://www.youtube.com/embed/{i}", "name": "Трейлер", "site": "youtube"}
+                                for i in range(5)]},
+        "similarMovies": [{"id": series_id + i, "name": f"Похожий {i}", "poster": {"url": "u", "previewUrl": "p"},
+                           "type": "tv-series"} for i in range(20)],
+        "seasonsInfo": [{"number": n, "episodesCount": 10} for n in range(1, 6)],
+        "networks": {"items": [{"name": "HBO", "logo": {"url": "u"}}]},
+        "externalId": {"imdb": f"tt{series_id}", "tmdb": series_id},
+        "releaseYears": [{"start": 2010, "end": 2015}],
+    }
+
+
+def projected_document(doc: dict) -> dict:
+    return {field: doc[field] for field in SERIES_FIELDS if field in doc}
+
+
+def payload(docs) -> bytes:
+    return json.dumps({"docs": docs, "total": len(docs), "limit": len(docs), "page": 1, "pages": 1},
+                      ensure_ascii=False).encode("utf-8")
+
+
+def parse_time(raw: bytes, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        json.loads(raw)
+    return (time.perf_counter() - started) / repeat
+
+
+def retained_bytes(build) -> int:
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del value
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--persons", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    full_docs = [full_document(1000 + i, args.persons) for i in range(args.entries)]
+    projected_docs = [projected_document(doc) for doc in full_docs]
+
+    single_full = payload(full_docs[:1])
+    single_projected = payload(projected_docs[:1])
+    print(
+        f"Один сериал по сети: полный {len(single_full) / 1024:.1f} КБ, "
+        f"selectFields {len(single_projected) / 1024:.1f} КБ "
+        f"({len(single_projected) / len(single_full):.0%})"
+    )
+
+    full_time = parse_time(single_full, args.repeat * 50)
+    projected_time = parse_time(single_projected, args.repeat * 50)
+    started = time.perf_counter()
+    for _ in range(args.repeat * 50):
+        Series.from_doc(json.loads(single_projected)["docs"][0])
+    records_time = (time.perf_counter() - started) / (args.repeat * 50)
+    print(
+        f"Разбор одного ответа: полный {full_time * 1e6:.0f} мкс, "
+        f"selectFields {projected_time * 1e6:.0f} мкс, "
+        f"selectFields + Series {records_time * 1e6:.0f} мкс"
+    )
+
+    raw_full = payload(full_docs)
+    raw_projected = payload(projected_docs)
+    full_memory = retained_bytes(lambda: json.loads(raw_full)["docs"])
+    projected_memory = retained_bytes(lambda: json.loads(raw_projected)["docs"])
+    records_memory = retained_bytes(lambda: [Series.from_doc(doc) for doc in json.loads(raw_projected)["docs"]])
+    print(
+        f"Память на запись в кэше ({args.entries} записей): "
+        f"полный dict {full_memory / args.entries / 1024:.1f} КБ, "
+        f"dict selectFields {projected_memory / args.entries / 1024:.1f} КБ, "
+        f"Series {records_memory / args.entries / 1024:.2f} КБ"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Бенчмарк холодного старта ботов: разбивка -X importtime и время до первого обработанного обновления.
+
+Каждый замер — отдельный процесс интерпретатора во временном каталоге (базы и папки ботов создаются там).
+Время до первого обновления: от запуска процесса до первого запроса ответа в Bot API после /start.
+Сетевые запросы к Telegram перехватываются, поэтому токены могут быть фиктивными.
+
+Запуск: python benchmarks/bench_startup.py --runs 5 [serial_poisk main_bot ...]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Точка входа -> команда, на которую бот отвечает без внешних API (None — только импорт)
+ENTRY_POINTS = {
+    "serial_poisk": "/start",
+    "main_bot": "/start",
+    "main": "/start",
+    "cats": "/start",
+    "nasa": None,
+    "dz1": "/start",
+    "dz2": "/start",
+    "dz3": "/start",
+}
+
+FAKE_TOKEN = "123456789:AAbenchmarkbenchmarkbenchmarkbench00"
+
+# Выполняется в дочернем процессе: импорт модуля, одно обновление, выход при первом запросе ответа
+CHILD = r"""
+import asyncio, os, sys, time
+module_name, command = sys.argv[1], sys.argv[2]
+sys.path.insert(0, os.environ["BENCH_ROOT"])
+from bot_routes import PTBRoute, load_route
+
+done = asyncio.Event()
+
+class Answered(Exception):
+    pass
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1, "date": int(time.time()), "text": command,
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "Bench"},
+        "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+    },
+}
+
+async def main():
+    route = load_route(module_name)
+    if isinstance(route, PTBRoute):
+        from telegram import Update
+        limiter = route.application.bot.rate_limiter
+
+        async def intercept(callback, args, kwargs, endpoint, data, rate_limit_args):
+            if endpoint == "getMe":
+                return {"id": 123456789, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+            done.set()
+            raise Answered()
+
+        limiter.process_request = intercept
+        await route.application.initialize()
+        update = Update.de_json(UPDATE, route.application.bot)
+        asyncio.ensure_future(route.application.process_update(update))
+    else:
+        async def intercept(make_request, bot, method):
+            done.set()
+            raise Answered()
+
+        route.bot.session.middleware(intercept)
+        asyncio.ensure_future(route.dispatcher.feed_raw_update(route.bot, UPDATE))
+    await asyncio.wait_for(done.wait(), timeout=30)
+    print("ANSWERED", flush=True)
+    os._exit(0)
+
+asyncio.run(main())
+"""
+
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    env.update({
+        "BENCH_ROOT": str(ROOT),
+        "PYTHONPATH": str(ROOT),
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "TELEGRAM_TOKEN": env.get("TELEGRAM_TOKEN", FAKE_TOKEN),
+        "TELEGRAM_BOT_TOKEN": env.get("TELEGRAM_BOT_TOKEN", FAKE_TOKEN),
+    })
+    return env
+
+
+# Разбор вывода -X importtime: суммарное время и самые тяжелые пакеты (собственное время всех их модулей)
+def import_breakdown(module: str, workdir: str, top: int):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=workdir, env=child_env(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "ошибка"
+        return None, error
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_time, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not self_time.isdigit():
+            continue
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_time)
+    total = sum(packages.values())
+    return total, sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def first_update_time(module: str, command: str, workdir: str):
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", CHILD, module, command],
+        cwd=workdir, env=child_env(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    for line in process.stdout:
+        if line.startswith("ANSWERED"):
+            elapsed = time.perf_counter() - started
+            process.wait()
+            return elapsed
+    process.wait()
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("modules", nargs="*", default=list(ENTRY_POINTS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        with tempfile.TemporaryDirectory() as workdir:
+            total, breakdown = import_breakdown(module, workdir, args.top)
+            if total is None:
+                print(f"{module}: импорт не удался ({breakdown})")
+                continue
+            print(f"{module}: импорт {total / 1000:.0f} мс")
+            for package, micros in breakdown:
+                print(f"    {package:<24} {micros / 1000:8.1f} мс")
+
+            command = ENTRY_POINTS.get(module)
+            if command is None:
+                continue
+            timings = [first_update_time(module, command, workdir) for _ in range(args.runs)]
+            timings = [t for t in timings if t is not None]
+            if timings:
+                print(
+                    f"    до первого ответа ({command}): медиана {statistics.median(timings) * 1000:.0f} мс, "
+                    f"мин {min(timings) * 1000:.0f} мс"
+                )
+            else:
+                print(f"    до первого ответа ({command}): ответ не получен")
+
+
+if __name__ == "__main__":
+    main()
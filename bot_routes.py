@@ -0,0 +1,123 @@
+import asyncio
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PTBRoute:
+    """Бот python-telegram-bot в общем процессе: webhook (очередь Application) или polling (Updater)."""
+
+    def __init__(self, name: str, application):
+        self.name = name
+        self.application = application
+        self.token = application.bot.token
+
+    # Тот же порядок хуков, что в Application.run_polling
+    async def start(self) -> None:
+        await self.application.initialize()
+        if self.application.post_init:
+            await self.application.post_init(self.application)
+        await self.application.start()
+
+    async def start_polling(self) -> None:
+        await self.start()
+        await self.application.updater.start_polling()
+
+    async def set_webhook(self, url: str, secret: str) -> None:
+        from telegram import Update
+
+        await self.application.bot.set_webhook(url=url, secret_token=secret, allowed_updates=Update.ALL_TYPES)
+
+    async def feed(self, data: dict) -> None:
+        from telegram import Update
+
+        await self.application.update_queue.put(Update.de_json(data, self.application.bot))
+
+    async def stop(self) -> None:
+        updater = self.application.updater
+        if updater is not None and updater.running:
+            await updater.stop()
+        if self.application.running:
+            await self.application.stop()
+            if self.application.post_stop:
+                await self.application.post_stop(self.application)
+        await self.application.shutdown()
+        if self.application.post_shutdown:
+            await self.application.post_shutdown(self.application)
+
+
+class AiogramRoute:
+    """Бот aiogram в общем процессе: webhook (feed_raw_update) или polling (start_polling в задаче)."""
+
+    def __init__(self, name: str, dispatcher, bot):
+        self.name = name
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.token = bot.token
+        # False, если сессия общая и закрывается запускающим кодом
+        self.close_session = True
+        self._tasks = set()
+        self._polling = None
+
+    # Те же данные, что передает в хуки start_polling
+    def _workflow_data(self) -> dict:
+        return {"dispatcher": self.dispatcher, "bots": [self.bot], "bot": self.bot, **self.dispatcher.workflow_data}
+
+    async def start(self) -> None:
+        await self.dispatcher.emit_startup(**self._workflow_data())
+
+    # Хуки startup/shutdown вызывает сам start_polling
+    async def start_polling(self) -> None:
+        await self.bot.delete_webhook()
+        self._polling = asyncio.create_task(
+            self.dispatcher.start_polling(self.bot, handle_signals=False, close_bot_session=False)
+        )
+
+    async def set_webhook(self, url: str, secret: str) -> None:
+        await self.bot.set_webhook(
+            url=url,
+            secret_token=secret,
+            allowed_updates=self.dispatcher.resolve_used_update_types(),
+        )
+
+    async def feed(self, data: dict) -> None:
+        task = asyncio.create_task(self.dispatcher.feed_raw_update(self.bot, data))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def stop(self) -> None:
+        if self._polling is not None:
+            if not self._polling.done():
+                await self.dispatcher.stop_polling()
+            await asyncio.gather(self._polling, return_exceptions=True)
+            self._polling = None
+        else:
+            if self._tasks:
+                await asyncio.wait(self._tasks, timeout=10)
+            await self.dispatcher.emit_shutdown(**self._workflow_data())
+        if self.close_session:
+            await self.bot.session.close()
+
+
+# Бот из модуля репозитория: build_application() для PTB, модульные dp и bot для aiogram
+def load_route(name: str):
+    module = importlib.import_module(name)
+    if hasattr(module, "build_application"):
+        return PTBRoute(name, module.build_application())
+    if hasattr(module, "dp") and hasattr(module, "bot"):
+        return AiogramRoute(name, module.dp, module.bot)
+    raise ValueError(f"Модуль {name} не содержит бота")
+
+
+# Один токен — один получатель обновлений (webhook или getUpdates): повторные боты пропускаются
+def unique_routes(routes) -> list:
+    seen = {}
+    result = []
+    for route in routes:
+        if route.token in seen:
+            logger.warning(f"{route.name}: тот же токен, что у {seen[route.token]}, бот пропущен")
+            continue
+        seen[route.token] = route.name
+        result.append(route)
+    return result
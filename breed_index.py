@@ -0,0 +1,100 @@
+import bisect
+import difflib
+import re
+
+_SPACES_RE = re.compile(r"[\s\-_]+")
+
+
+def normalize(text: str) -> str:
+    return _SPACES_RE.sub(" ", text.casefold()).strip()
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class BreedIndex:
+    """Индекс пород TheCatAPI в памяти.
+
+    Поиск по точному названию, альтернативным названиям и id, затем по префиксу,
+    затем нечеткий: кандидаты по общим триграммам, лучший выбирается по сходству строк.
+    Индекс перестраивается целиком и подменяется одной операцией.
+    """
+
+    def __init__(self, breeds=(), min_similarity: float = 0.75):
+        self.min_similarity = min_similarity
+        self._state = ({}, [], {})
+        self.build(breeds)
+
+    def __len__(self):
+        return len({id(breed) for breed in self._state[0].values()})
+
+    def build(self, breeds) -> None:
+        exact = {}
+        for breed in breeds:
+            keys = [breed.get("name", ""), breed.get("id", "")]
+            keys.extend((breed.get("alt_names") or "").split(","))
+            for key in keys:
+                key = normalize(key)
+                if key:
+                    exact.setdefault(key, breed)
+
+        grams = {}
+        for key in exact:
+            for gram in trigrams(key):
+                grams.setdefault(gram, set()).add(key)
+        self._state = (exact, sorted(exact), grams)
+
+    def lookup(self, query: str):
+        exact, sorted_keys, grams = self._state
+        query = normalize(query)
+        if not query:
+            return None
+
+        breed = exact.get(query)
+        if breed is not None:
+            return breed
+
+        # Префикс: «siam» -> «siamese», если все совпадения ведут к одной породе
+        prefixed = self._prefixed(query)
+        if len(prefixed) == 1:
+            return prefixed[0]
+        # Префикс подходит к нескольким породам: выбирать одну из них (в том числе нечетким
+        # поиском, который предпочтет самое короткое название) нельзя
+        if prefixed:
+            return None
+
+        # Опечатки: кандидаты с общими триграммами, затем сходство по difflib
+        counts = {}
+        for gram in trigrams(query):
+            for key in grams.get(gram, ()):
+                counts[key] = counts.get(key, 0) + 1
+        candidates = sorted(counts, key=counts.get, reverse=True)[:20]
+        best_key, best_score = None, 0.0
+        for key in candidates:
+            score = difflib.SequenceMatcher(None, query, key).ratio()
+            if score > best_score:
+                best_key, best_score = key, score
+        if best_key is not None and best_score >= self.min_similarity:
+            return exact[best_key]
+        return None
+
+    # Разные породы, у которых название, альтернативное название или id начинается с query
+    def _prefixed(self, query: str) -> list:
+        exact, sorted_keys, _ = self._state
+        start = bisect.bisect_left(sorted_keys, query)
+        breeds = []
+        for key in sorted_keys[start:]:
+            if not key.startswith(query):
+                break
+            if all(exact[key] is not breed for breed in breeds):
+                breeds.append(exact[key])
+        return breeds
+
+    # Варианты для уточнения, если lookup не нашел породу: названия пород с таким префиксом
+    def suggestions(self, query: str, limit: int = 5) -> list:
+        query = normalize(query)
+        if not query:
+            return []
+        return sorted(breed.get("name", "") for breed in self._prefixed(query))[:limit]
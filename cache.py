@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+# Приблизительный размер значения в байтах (по JSON-представлению)
+def estimate_size(value) -> int:
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 1024
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at", "stale_until")
+
+    def __init__(self, value, size, expires_at, stale_until):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    """LRU-кэш ответов API с TTL и stale-while-revalidate.
+
+    Вытеснение идет по числу записей и суммарному размеру в байтах.
+    Просроченная запись в пределах stale_ttl отдается сразу,
+    а обновление запускается в фоне.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 8 * 1024 * 1024, stale_ttl: float = 86400):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._refreshing = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    # Значение из кэша без обращения к источнику (None, если записи нет или она полностью устарела)
+    def get(self, key, allow_stale: bool = False):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if now < entry.expires_at or (allow_stale and now < entry.stale_until):
+            self._entries.move_to_end(key)
+            return entry.value
+        return None
+
+    def set(self, key, value, ttl: float, stale_ttl: float = None) -> None:
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        now = time.monotonic()
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+        self._entries[key] = _Entry(value, size, now + ttl, now + ttl + stale_ttl)
+        self._bytes += size
+        self._evict()
+
+    def invalidate(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    # Основной метод: свежее значение из кэша, устаревшее с фоновым обновлением или запрос к источнику.
+    # fetch — функция без аргументов, возвращающая корутину; ее исключения пробрасываются вызывающему.
+    async def get_or_fetch(self, key, fetch, ttl: float, stale_ttl: float = None):
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            if now < entry.expires_at:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if now < entry.stale_until:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._schedule_refresh(key, fetch, ttl, stale_ttl)
+                return entry.value
+
+        self.misses += 1
+        value = await fetch()
+        self.set(key, value, ttl, stale_ttl)
+        return value
+
+    # Принудительное обновление записи (для фоновых задач прогрева)
+    async def refresh(self, key, fetch, ttl: float, stale_ttl: float = None):
+        value = await fetch()
+        self.set(key, value, ttl, stale_ttl)
+        return value
+
+    def _schedule_refresh(self, key, fetch, ttl, stale_ttl) -> None:
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, fetch, ttl, stale_ttl))
+        self._refreshing[key] = task
+
+    async def _refresh(self, key, fetch, ttl, stale_ttl) -> None:
+        try:
+            value = await fetch()
+            self.set(key, value, ttl, stale_ttl)
+        except Exception as e:
+            logger.warning(f"Не удалось обновить запись кэша {key!r}: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
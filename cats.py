@@ -1,38 +1,77 @@
 import asyncio
-import requests
+import logging
 from aiogram import Bot, Dispatcher
 from aiogram.filters import Command
 from aiogram.types import Message
 
+from breed_index import BreedIndex
 from config import TOKEN, THE_CAT_API_KEY
+from http_client import HTTP_ERRORS, fetch_json, close_session
+from image_pool import ImagePool
+from aiogram_rate_limiter import AiogramRateLimitMiddleware
 
 # Вставьте сюда ваш токен телеграм-бота и API-ключ для TheCatAPI
 
 bot = Bot(token=TOKEN)
 dp = Dispatcher()
+# Общие лимиты Telegram на исходящие сообщения
+bot.session.middleware(AiogramRateLimitMiddleware())
+
+# Интервал обновления каталога пород (секунды)
+BREEDS_REFRESH_INTERVAL = 6 * 3600
+
+# Запас картинок на породу, интервал фонового пополнения и породы, прогреваемые при запуске
+IMAGE_POOL_SIZE = 5
+IMAGE_PREFETCH_INTERVAL = 10 * 60
+POPULAR_BREEDS = ["beng", "siam", "mcoo", "pers", "ragd", "sphy", "bsho", "abys", "rblu", "sfol"]
+
+# Каталог пород загружается один раз при запуске и обновляется в фоне
+breed_index = BreedIndex()
 
 # Функция для получения списка пород кошек
-def get_cat_breeds():
+async def get_cat_breeds():
    url = "https://api.thecatapi.com/v1/breeds"
    headers = {"x-api-key": THE_CAT_API_KEY}
-   response = requests.get(url, headers=headers)
-   return response.json()
+   return await fetch_json(url, headers=headers)
 
-# Функция для получения картинки кошки по породе
-def get_cat_image_by_breed(breed_id):
-   url = f"https://api.thecatapi.com/v1/images/search?breed_ids={breed_id}"
+async def load_breeds():
+   try:
+       breeds = await get_cat_breeds()
+   except HTTP_ERRORS as e:
+       logging.error(f"Не удалось загрузить список пород: {e}")
+       return
+   breed_index.build(breeds)
+   logging.info(f"Загружено пород: {len(breed_index)}")
+
+async def refresh_breeds_periodically():
+   while True:
+       await asyncio.sleep(BREEDS_REFRESH_INTERVAL)
+       await load_breeds()
+
+# Функция для получения нескольких картинок кошек по породе одним запросом
+async def get_cat_images_by_breed(breed_id, limit):
+   url = "https://api.thecatapi.com/v1/images/search"
    headers = {"x-api-key": THE_CAT_API_KEY}
-   response = requests.get(url, headers=headers)
-   data = response.json()
-   return data[0]['url']
+   data = await fetch_json(url, headers=headers, params={"breed_ids": breed_id, "limit": limit})
+   return [item['url'] for item in data if item.get('url')]
+
+# Готовые ссылки на картинки по породам, пополняются в фоне
+image_pool = ImagePool(get_cat_images_by_breed, size=IMAGE_POOL_SIZE)
 
-# Функция для получения информации о породе кошек
+# Функция для получения картинки кошки по породе
+async def get_cat_image_by_breed(breed_id):
+   return await image_pool.get(breed_id)
+
+# Поддержание запаса картинок для популярных пород
+async def prefetch_images_periodically():
+   await image_pool.warm(POPULAR_BREEDS)
+   while True:
+       await asyncio.sleep(IMAGE_PREFETCH_INTERVAL)
+       await image_pool.warm(set(POPULAR_BREEDS) | set(image_pool.popular()))
+
+# Функция для получения информации о породе кошек (по названию, альтернативному названию, id или с опечаткой)
 def get_breed_info(breed_name):
-   breeds = get_cat_breeds()
-   for breed in breeds:
-       if breed['name'].lower() == breed_name.lower():
-           return breed
-   return None
+   return breed_index.lookup(breed_name or "")
 
 @dp.message(Command("start"))
 async def start_command(message: Message):
@@ -41,9 +80,12 @@ async def start_command(message: Message):
 @dp.message()
 async def send_cat_info(message: Message):
    breed_name = message.text
+   # Каталог пуст, только если загрузка при запуске не удалась
+   if not len(breed_index):
+       await load_breeds()
    breed_info = get_breed_info(breed_name)
    if breed_info:
-       cat_image_url = get_cat_image_by_breed(breed_info['id'])
+       cat_image_url = await get_cat_image_by_breed(breed_info['id'])
        info = (
            f"Breed: {breed_info['name']}\n"
            f"Origin: {breed_info['origin']}\n"
@@ -51,11 +93,35 @@ async def send_cat_info(message: Message):
            f"Temperament: {breed_info['temperament']}\n"
            f"Life Span: {breed_info['life_span']} years"
        )
-       await message.answer_photo(photo=cat_image_url, caption=info)
+       if cat_image_url:
+           await message.answer_photo(photo=cat_image_url, caption=info)
+       else:
+           await message.answer(info)
    else:
-       await message.answer("Порода не найдена. Попробуйте еще раз.")
+       # Общий префикс нескольких пород: просим уточнить вместо случайной породы
+       suggestions = breed_index.suggestions(breed_name or "")
+       if len(suggestions) > 1:
+           await message.answer("Уточните породу: " + ", ".join(suggestions))
+       else:
+           await message.answer("Порода не найдена. Попробуйте еще раз.")
+
+refresh_tasks = set()
+
+@dp.startup()
+async def on_startup():
+   await load_breeds()
+   refresh_tasks.add(asyncio.create_task(refresh_breeds_periodically()))
+   refresh_tasks.add(asyncio.create_task(prefetch_images_periodically()))
+
+@dp.shutdown()
+async def on_shutdown():
+   for task in refresh_tasks:
+       task.cancel()
+   await close_session()
 
 async def main():
+   # Polling не работает, пока у бота установлен webhook
+   await bot.delete_webhook()
    await dp.start_polling(bot)
 
 if __name__ == '__main__':
@@ -10,9 +10,15 @@ from telegram.ext import (
     ContextTypes,
 )
 
+from ptb_rate_limiter import PTBRateLimiter
+from send_scheduler import bot_key
+from sqlite_persistence import SQLitePersistence
+
 # Загрузка переменных окружения
 load_dotenv()
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Файл с состоянием диалогов и данными пользователей (переживает перезапуск)
+STATE_DB_PATH = os.getenv("DZ1_STATE_DB_PATH", "dz1_state.db")
 
 # Состояния для ConversationHandler
 GET_NAME, SHOW_MENU = range(2)
@@ -76,9 +82,15 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return ConversationHandler.END
 
 
-def main() -> None:
-    """Запуск бота."""
-    application = Application.builder().token(TOKEN).build()
+def build_application() -> Application:
+    """Создание приложения с обработчиками (для polling и webhook-сервера)."""
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .rate_limiter(PTBRateLimiter(bot_key(TOKEN)))
+        .persistence(SQLitePersistence(STATE_DB_PATH))
+        .build()
+    )
 
     # ConversationHandler для управления диалогом
     conv_handler = ConversationHandler(
@@ -88,9 +100,17 @@ def main() -> None:
             SHOW_MENU: [MessageHandler(filters.Regex(f"^({BUTTON_HELLO}|{BUTTON_BYE})$"), show_menu)],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        name="dz1_dialog",
+        persistent=True,
     )
 
     application.add_handler(conv_handler)
+    return application
+
+
+def main() -> None:
+    """Запуск бота."""
+    application = build_application()
 
     # Запуск бота
     application.run_polling()
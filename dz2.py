@@ -8,6 +8,9 @@ from telegram.ext import (
     ContextTypes,
 )
 
+from ptb_rate_limiter import PTBRateLimiter
+from send_scheduler import bot_key
+
 # Загрузка переменных окружения
 load_dotenv()
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -47,9 +50,14 @@ async def button_click(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     query = update.callback_query
     await query.answer()
 
-def main() -> None:
-    """Запуск бота."""
-    application = Application.builder().token(TOKEN).build()
+def build_application() -> Application:
+    """Создание приложения с обработчиками (для polling и webhook-сервера)."""
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .rate_limiter(PTBRateLimiter(bot_key(TOKEN)))
+        .build()
+    )
 
     # Регистрация обработчиков команд
     application.add_handler(CommandHandler("start", start))
@@ -57,6 +65,11 @@ def main() -> None:
 
     # Регистрация обработчика инлайн-кнопок
     application.add_handler(CallbackQueryHandler(button_click))
+    return application
+
+def main() -> None:
+    """Запуск бота."""
+    application = build_application()
 
     # Запуск бота
     print("Бот запущен...")
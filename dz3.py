@@ -9,6 +9,8 @@ from aiogram.client.default import DefaultBotProperties
 from dotenv import load_dotenv
 import os
 
+from aiogram_rate_limiter import AiogramRateLimitMiddleware
+
 # Загрузка токена из .env
 load_dotenv()
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -22,6 +24,8 @@ bot = Bot(
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
 dp = Dispatcher()
+# Общие лимиты Telegram на исходящие сообщения
+bot.session.middleware(AiogramRateLimitMiddleware())
 router = Router()
 dp.include_router(router)
 
@@ -63,6 +67,8 @@ async def on_option_selected(callback: types.CallbackQuery):
 
 # Запуск бота
 async def main():
+    # Polling не работает, пока у бота установлен webhook
+    await bot.delete_webhook()
     await dp.start_polling(bot)
 
 if __name__ == "__main__":
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Таблица с составным ключом (user_id, series_id): дубли невозможны,
+# а избранное одного пользователя лежит в B-дереве подряд
+FAVORITES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    username TEXT,
+    first_name TEXT,
+    last_name TEXT
+);
+CREATE TABLE IF NOT EXISTS user_favorites (
+    user_id INTEGER NOT NULL,
+    series_id INTEGER NOT NULL,
+    series_name TEXT,
+    added_at REAL NOT NULL,
+    PRIMARY KEY (user_id, series_id),
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+) WITHOUT ROWID;
+"""
+
+# Покрывающий индекс для списка избранного в порядке добавления (без обращения к таблице)
+FAVORITES_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_user_favorites_recent
+    ON user_favorites (user_id, added_at DESC, series_name);
+"""
+
+
+def _execute_statements(conn: sqlite3.Connection, script: str) -> None:
+    for statement in script.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+
+
+# Перестроение старой таблицы user_favorites (без ключа и индексов) с удалением дублей.
+# Выполняется одной транзакцией: при сбое остается исходная таблица.
+def migrate_favorites(conn: sqlite3.Connection) -> None:
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'user_favorites'"
+    ).fetchone()
+    conn.execute("BEGIN")
+    try:
+        if row is not None and "PRIMARY KEY" not in row[0].upper():
+            logger.info("Миграция user_favorites: составной ключ и удаление дублей")
+            conn.execute("ALTER TABLE user_favorites RENAME TO user_favorites_old")
+            _execute_statements(conn, FAVORITES_SCHEMA)
+            total, incomplete = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(user_id IS NULL OR series_id IS NULL), 0) FROM user_favorites_old"
+            ).fetchone()
+            migrated = conn.execute(
+                """
+                INSERT OR IGNORE INTO user_favorites (user_id, series_id, series_name, added_at)
+                SELECT user_id, series_id, series_name, ? FROM user_favorites_old
+                WHERE user_id IS NOT NULL AND series_id IS NOT NULL
+                """,
+                (time.time(),),
+            ).rowcount
+            conn.execute("DROP TABLE user_favorites_old")
+            logger.info(
+                f"Миграция user_favorites: перенесено {migrated} из {total} строк, "
+                f"удалено без user_id или series_id: {incomplete}, дублей: {total - incomplete - migrated}"
+            )
+        else:
+            _execute_statements(conn, FAVORITES_SCHEMA)
+        _execute_statements(conn, FAVORITES_INDEXES)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+class FavoritesStore:
+    """Избранное пользователей с пакетной записью.
+
+    Операции add/remove складываются в очередь, фоновая задача выполняет их
+    одной транзакцией в пуле потоков. Вызов завершается после фиксации транзакции.
+    """
+
+    def __init__(self, db_path: str = "series_bot.db", batch_size: int = 500, batch_delay: float = 0.02):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self._writer = self._connect()
+        migrate_favorites(self._writer)
+        self._reader = self._connect()
+        self._write_lock = threading.Lock()
+        self._queue = None
+        self._worker = None
+        # Последняя незавершенная запись по каждому пользователю (для чтения своих же изменений)
+        self._pending = {}
+        self.batches = 0
+        self.writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    async def add(self, user_id: int, series_id: int, series_name: str, user=None) -> None:
+        await self._submit(user_id, ("add", user_id, series_id, series_name, user))
+
+    async def remove(self, user_id: int, series_id: int) -> None:
+        await self._submit(user_id, ("remove", user_id, series_id, None, None))
+
+    # Список избранного пользователя: [(series_id, series_name), ...], новые сначала
+    async def list(self, user_id: int, limit: int = 50) -> list:
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            await asyncio.shield(pending)
+        return self._reader.execute(
+            """
+            SELECT series_id, series_name FROM user_favorites
+            WHERE user_id = ?
+            ORDER BY added_at DESC
+            LIMIT ?
+            """,
+            (user_id, limit),
+        ).fetchall()
+
+    def contains(self, user_id: int, series_id: int) -> bool:
+        return self._reader.execute(
+            "SELECT 1 FROM user_favorites WHERE user_id = ? AND series_id = ?",
+            (user_id, series_id),
+        ).fetchone() is not None
+
+    async def _submit(self, user_id: int, op: tuple) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._pending[user_id] = future
+        await self._queue.put((op, future))
+        try:
+            await future
+        finally:
+            if self._pending.get(user_id) is future:
+                del self._pending[user_id]
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # Небольшая задержка, чтобы собрать соседние записи в одну транзакцию
+            await asyncio.sleep(self.batch_delay)
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            ops = [op for op, _ in batch]
+            try:
+                await asyncio.to_thread(self._write_batch, ops)
+            except Exception as e:
+                logger.error(f"Ошибка записи избранного: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+
+    def _write_batch(self, ops: list) -> None:
+        now = time.time()
+        with self._write_lock, self._writer:
+            for kind, user_id, series_id, series_name, user in ops:
+                if kind == "add":
+                    username, first_name, last_name = user or (None, None, None)
+                    self._writer.execute(
+                        """
+                        INSERT INTO users (user_id, username, first_name, last_name) VALUES (?, ?, ?, ?)
+                        ON CONFLICT (user_id) DO UPDATE SET
+                            username = COALESCE(excluded.username, username),
+                            first_name = COALESCE(excluded.first_name, first_name),
+                            last_name = COALESCE(excluded.last_name, last_name)
+                        """,
+                        (user_id, username, first_name, last_name),
+                    )
+                    self._writer.execute(
+                        """
+                        INSERT INTO user_favorites (user_id, series_id, series_name, added_at)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT (user_id, series_id) DO UPDATE SET series_name = excluded.series_name
+                        """,
+                        (user_id, series_id, series_name, now),
+                    )
+                else:
+                    self._writer.execute(
+                        "DELETE FROM user_favorites WHERE user_id = ? AND series_id = ?",
+                        (user_id, series_id),
+                    )
+        self.batches += 1
+        self.writes += len(ops)
+
+    async def close(self) -> None:
+        if self._queue is not None:
+            while not self._queue.empty() or any(not f.done() for f in self._pending.values()):
+                await asyncio.sleep(self.batch_delay)
+        if self._worker is not None:
+            self._worker.cancel()
+        self._reader.close()
+        self._writer.close()
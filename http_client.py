@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Лимиты пула соединений (можно переопределить через .env)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+
+class HTTPError(Exception):
+    """Ошибка сети или HTTP-статус ответа (status — код ответа, если он был получен)."""
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+# Ошибки, которые вызывающий код должен перехватывать вместо requests.exceptions.RequestException.
+# Собственный тип вместо aiohttp.ClientError: aiohttp импортируется только при первом запросе.
+HTTP_ERRORS = (HTTPError, asyncio.TimeoutError)
+
+_session = None
+
+
+# Общая сессия с пулом соединений и keep-alive.
+# Создается лениво внутри работающего event loop и переиспользуется всеми запросами.
+def get_session():
+    global _session
+    if _session is None or _session.closed:
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_MAX_CONNECTIONS,
+            limit_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+            raise_for_status=True,
+        )
+    return _session
+
+
+# Параметры запроса списком пар: значения-списки повторяют параметр (selectFields=id&selectFields=name)
+def query_pairs(params) -> list:
+    pairs = []
+    for key, value in (params or {}).items():
+        if isinstance(value, (list, tuple)):
+            pairs.extend((key, str(item)) for item in value)
+        else:
+            pairs.append((key, str(value)))
+    return pairs
+
+
+# GET-запрос с разбором JSON. Ошибки сети и HTTP-статусы пробрасываются как HTTP_ERRORS.
+async def fetch_json(url: str, headers=None, params=None, timeout: float = None):
+    import aiohttp
+
+    session = get_session()
+    request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+    if isinstance(params, dict):
+        params = query_pairs(params)
+    try:
+        async with session.get(url, headers=headers, params=params, timeout=request_timeout) as response:
+            return await response.json(content_type=None)
+    except aiohttp.ClientError as e:
+        raise HTTPError(str(e) or type(e).__name__, getattr(e, "status", None)) from e
+
+
+# Закрытие общей сессии при остановке бота
+async def close_session() -> None:
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("HTTP-сессия закрыта")
+    _session = None
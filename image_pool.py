@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePool:
+    """Заранее загруженные ссылки на картинки по каждой породе.
+
+    Для породы хранится кольцевой буфер готовых URL. Ответ берет URL из буфера,
+    а когда в буфере остается меньше low_watermark ссылок, он пополняется в фоне
+    одним запросом. Пустой буфер пополняется синхронно для ожидающего ответа.
+    """
+
+    def __init__(self, fetch_batch, size: int = 5, low_watermark: int = 2):
+        # fetch_batch(breed_id, limit) -> корутина со списком URL
+        self.fetch_batch = fetch_batch
+        self.size = size
+        self.low_watermark = low_watermark
+        self._buffers = {}
+        self._refills = {}
+        self.requests = Counter()
+        self.hits = 0
+        self.misses = 0
+
+    def _buffer(self, breed_id: str) -> deque:
+        buffer = self._buffers.get(breed_id)
+        if buffer is None:
+            buffer = self._buffers[breed_id] = deque(maxlen=self.size)
+        return buffer
+
+    async def get(self, breed_id: str):
+        self.requests[breed_id] += 1
+        buffer = self._buffer(breed_id)
+        if not buffer:
+            self.misses += 1
+            await self._refill_task(breed_id)
+        else:
+            self.hits += 1
+        url = buffer.popleft() if buffer else None
+        if len(buffer) < self.low_watermark:
+            self._refill_task(breed_id)
+        return url
+
+    # Одна задача пополнения на породу: повторные вызовы получают ту же задачу
+    def _refill_task(self, breed_id: str) -> asyncio.Task:
+        task = self._refills.get(breed_id)
+        if task is None or task.done():
+            task = self._refills[breed_id] = asyncio.create_task(self._refill(breed_id))
+        return task
+
+    async def _refill(self, breed_id: str) -> None:
+        buffer = self._buffer(breed_id)
+        try:
+            urls = await self.fetch_batch(breed_id, self.size)
+        except Exception as e:
+            logger.warning(f"Не удалось пополнить картинки породы {breed_id}: {e}")
+            return
+        known = set(buffer)
+        for url in urls:
+            if url not in known:
+                buffer.append(url)
+                known.add(url)
+
+    # Прогрев буферов для популярных пород (при запуске и периодически).
+    # Породы, в буфере которых не меньше low_watermark ссылок, не запрашиваются.
+    async def warm(self, breed_ids) -> None:
+        await asyncio.gather(*(
+            self._refill_task(breed_id)
+            for breed_id in breed_ids
+            if len(self._buffer(breed_id)) < self.low_watermark
+        ))
+
+    def popular(self, limit: int = 10) -> list:
+        return [breed_id for breed_id, _ in self.requests.most_common(limit)]
+
+    def stats(self) -> dict:
+        return {
+            "breeds": len(self._buffers),
+            "ready": sum(len(buffer) for buffer in self._buffers.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -3,36 +3,45 @@ import requests
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 
+from singleflight import ThreadSingleFlight, make_key
+
 load_dotenv()
 API_KEY = os.getenv("KINOPOISK_API_KEY")
 
 class KinopoiskAPI:
     BASE_URL = "https://api.kinopoisk.dev/v1.4"
 
+    # Одинаковые одновременные запросы из разных потоков выполняются один раз
+    flight = ThreadSingleFlight()
+
     @staticmethod
-    def search_movies(query: str, limit: int = 5) -> List[Dict]:
+    def _get(path: str, params: Dict) -> Dict:
         headers = {
             "accept": "application/json",
             "X-API-KEY": API_KEY,
         }
+
+        def request() -> Dict:
+            response = requests.get(f"{KinopoiskAPI.BASE_URL}{path}", headers=headers, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        return KinopoiskAPI.flight.do(make_key(path, params), request)
+
+    @staticmethod
+    def search_movies(query: str, limit: int = 5) -> List[Dict]:
         params = {
-            "query": query,
+            "query": " ".join(query.split()).casefold(),
             "limit": limit,
         }
         try:
-            response = requests.get(f"{KinopoiskAPI.BASE_URL}/movie/search", headers=headers, params=params)
-            response.raise_for_status()
-            return response.json().get("docs", [])
+            return KinopoiskAPI._get("/movie/search", params).get("docs", [])
         except requests.exceptions.RequestException as e:
             print(f"Ошибка запроса: {e}")
             return []
 
     @staticmethod
     def get_popular_movies(limit: int = 5) -> List[Dict]:
-        headers = {
-            "accept": "application/json",
-            "X-API-KEY": API_KEY,
-        }
         params = {
             "limit": limit,
             "sortField": "votes.kp",
@@ -40,19 +49,13 @@ class KinopoiskAPI:
             "type": "movie",
         }
         try:
-            response = requests.get(f"{KinopoiskAPI.BASE_URL}/movie", headers=headers, params=params)
-            response.raise_for_status()
-            return response.json().get("docs", [])
+            return KinopoiskAPI._get("/movie", params).get("docs", [])
         except requests.exceptions.RequestException as e:
             print(f"Ошибка запроса популярных фильмов: {e}")
             return []
 
     @staticmethod
     def get_popular_series(limit: int = 5) -> List[Dict]:
-        headers = {
-            "accept": "application/json",
-            "X-API-KEY": API_KEY,
-        }
         params = {
             "limit": limit,
             "sortField": "votes.kp",
@@ -60,9 +63,7 @@ class KinopoiskAPI:
             "type": "tv-series",
         }
         try:
-            response = requests.get(f"{KinopoiskAPI.BASE_URL}/movie", headers=headers, params=params)
-            response.raise_for_status()
-            return response.json().get("docs", [])
+            return KinopoiskAPI._get("/movie", params).get("docs", [])
         except requests.exceptions.RequestException as e:
             print(f"Ошибка запроса популярных сериалов: {e}")
             return []
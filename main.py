@@ -2,26 +2,34 @@ import asyncio
 import random
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters import CommandStart, Command
-from aiogram.types import Message, FSInputFile
+from aiogram.types import Message
 from config import TOKEN
 import keyboard as kb
-
-from gtts import gTTS
-import os
+from media_registry import MediaRegistry
+from photo_store import PhotoStore
+from aiogram_rate_limiter import AiogramRateLimitMiddleware
 
 bot = Bot(token=TOKEN)
 dp = Dispatcher()
+# Общие лимиты Telegram на исходящие сообщения
+bot.session.middleware(AiogramRateLimitMiddleware())
+# file_id уже загруженных файлов, чтобы не отправлять их содержимое повторно
+media_registry = MediaRegistry()
+# Хранилище фото с адресацией по содержимому (одинаковые фото хранятся один раз)
+photo_store = PhotoStore('img')
 
 
 @dp.message(Command('voice'))
 async def voice(message: Message):
-    voice = FSInputFile("sample.ogg")
-    await message.answer_voice(voice)
+    await media_registry.send(bot.id, "voice", "sample.ogg", message.answer_voice, lambda m: m.voice.file_id)
 
 @dp.message(Command('audio'))
 async def audio(message: Message):
-    audio = FSInputFile('sound.mp3')
-    await bot.send_audio(message.chat.id, audio)
+    await media_registry.send(
+        bot.id, "audio", 'sound.mp3',
+        lambda audio: bot.send_audio(message.chat.id, audio),
+        lambda m: m.audio.file_id,
+    )
 
 @dp.message(Command('photos', prefix='&'))
 async def photo(message: Message):
@@ -36,7 +44,7 @@ async def photo(message: Message):
 async def react_photo(message: Message):
     responses = ['Ого, какая фотка!', 'Непонятно, что это такое', 'Не отправляй мне такое больше']
     await message.answer(random.choice(responses))
-    await bot.download(message.photo[-1], destination=f'img/{message.photo[-1].file_id}.jpg')
+    await photo_store.save(bot, message)
 
 @dp.message(Command('help'))
 async def help(message: Message):
@@ -1,11 +1,15 @@
+import asyncio
 import os
 import logging
+import threading
 from pathlib import Path
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command
-from aiogram.types import FSInputFile
 from dotenv import load_dotenv
-from deep_translator import GoogleTranslator
+from media_registry import MediaRegistry
+from photo_store import PhotoStore
+from aiogram_rate_limiter import AiogramRateLimitMiddleware
+from translator import TranslationService
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -21,6 +25,10 @@ if not TOKEN:
 # Инициализация бота и диспетчера
 bot = Bot(token=TOKEN)
 dp = Dispatcher()
+# Общие лимиты Telegram на исходящие сообщения
+bot.session.middleware(AiogramRateLimitMiddleware())
+# file_id уже загруженных файлов, чтобы не отправлять их содержимое повторно
+media_registry = MediaRegistry()
 
 # Создаем папки
 IMG_DIR = Path("img")
@@ -28,6 +36,40 @@ IMG_DIR.mkdir(exist_ok=True)
 ASSETS_DIR = Path("assets")
 ASSETS_DIR.mkdir(exist_ok=True)
 
+# Хранилище фото с адресацией по содержимому (одинаковые фото хранятся один раз)
+photo_store = PhotoStore(IMG_DIR)
+# Индекс перцептивных хэшей для поиска пережатых и уменьшенных копий.
+# Загружается (вместе с NumPy) в фоне после запуска или при первом фото, а не при импорте.
+# Без NumPy и Pillow индекс отключается: остается только проверка точных дублей по SHA-256.
+near_duplicates = None
+near_duplicates_available = True
+near_duplicates_lock = threading.Lock()
+
+def get_near_duplicates():
+    global near_duplicates, near_duplicates_available
+    with near_duplicates_lock:
+        if near_duplicates is None and near_duplicates_available:
+            try:
+                from phash_index import NearDuplicateIndex
+            except ImportError as e:
+                near_duplicates_available = False
+                logger.warning(f"Поиск похожих фото отключен, нужны numpy и Pillow: {e}")
+            else:
+                near_duplicates = NearDuplicateIndex(photo_store.manifest_path)
+    return near_duplicates
+
+# Вытесненное из хранилища фото удаляется и из индекса (вызывается из потока вытеснения)
+def forget_near_duplicate(sha256: str) -> None:
+    index = get_near_duplicates()
+    if index is not None:
+        index.remove(sha256)
+
+photo_store.on_evict.append(forget_near_duplicate)
+
+# Перевод в пуле потоков с кэшем и объединением сообщений в пакеты
+# (бэкенд задается TRANSLATION_BACKEND: google или echo для локальной проверки)
+translator = TranslationService()
+
 # Проверяем наличие голосового сообщения
 VOICE_PATH = ASSETS_DIR / "voice.ogg"
 if not VOICE_PATH.exists():
@@ -55,6 +97,7 @@ async def cmd_help(message: types.Message):
         "/help - Справка\n"
         "/info - Информация о боте\n"
         "/voice - Получить голосовое сообщение\n"
+        "/storage - Объем сохраненных фото\n"
         "/translate - Перевести текст\n\n"
         "Просто отправьте:\n"
         "- Фото (я его сохраню)\n"
@@ -77,12 +120,25 @@ async def cmd_info(message: types.Message):
     await message.answer(info_text)
 
 
+# Обработчик команды /storage: объем хранилища фото и счетчики вытеснения
+@dp.message(Command("storage"))
+async def cmd_storage(message: types.Message):
+    stats = photo_store.stats()
+    limit = f"{stats['max_bytes'] / 1024 ** 2:.1f} МБ" if stats['max_bytes'] else "без ограничения"
+    await message.answer(
+        "Хранилище фото:\n"
+        f"Файлов: {stats['blobs']}\n"
+        f"Занято: {stats['usage_bytes'] / 1024 ** 2:.1f} МБ из {limit}\n"
+        f"Удалено при вытеснении: {stats['evictions']} ({stats['evicted_bytes'] / 1024 ** 2:.1f} МБ)\n"
+        f"Повторных фото без скачивания: {stats['skipped_downloads']}"
+    )
+
+
 # Обработчик команды /voice
 @dp.message(Command("voice"))
 async def cmd_voice(message: types.Message):
     if VOICE_PATH.exists():
-        voice = FSInputFile(VOICE_PATH)
-        await message.answer_voice(voice)
+        await media_registry.send(bot.id, "voice", VOICE_PATH, message.answer_voice, lambda m: m.voice.file_id)
     else:
         await message.answer("Извините, голосовое сообщение временно недоступно")
 
@@ -96,36 +152,56 @@ async def cmd_translate(message: types.Message):
 # Обработчик фото
 @dp.message(F.photo)
 async def save_photo(message: types.Message):
-    photo = message.photo[-1]
-    file_id = photo.file_id
-    file = await bot.get_file(file_id)
-    file_path = file.file_path
-
-    photo_bytes = await bot.download_file(file_path)
-
-    save_path = IMG_DIR / f"{file_id}.jpg"
-    with open(save_path, "wb") as f:
-        f.write(photo_bytes.read())
-
-    await message.answer(f"Фото сохранено как {save_path.name}")
+    save_path, is_new = await photo_store.save(bot, message)
+
+    if not is_new:
+        await message.answer(f"Это фото уже сохранено как {save_path.name}")
+        return
+
+    index = near_duplicates or await asyncio.to_thread(get_near_duplicates)
+    matches = await index.check_and_add(save_path.stem, save_path) if index is not None else []
+    if matches and message.from_user and await asyncio.to_thread(
+        photo_store.user_has_sent, message.from_user.id, [sha256 for sha256, _ in matches]
+    ):
+        await message.answer(f"Вы уже присылали это фото. Сохранено как {save_path.name}")
+    else:
+        await message.answer(f"Фото сохранено как {save_path.name}")
 
 
 # Обработчик текста (перевод)
 @dp.message(F.text & ~F.text.startswith('/'))
 async def handle_text(message: types.Message):
+    if translator.is_english(message.text):
+        await message.answer("Текст уже на английском, переводить нечего.")
+        return
     try:
-        translated = GoogleTranslator(source='auto', target='en').translate(message.text)
+        translated = await translator.translate(message.text, "en")
         await message.answer(f"Перевод на английский:\n{translated}")
     except Exception as e:
         logger.error(f"Translation error: {e}")
         await message.answer("Ошибка перевода. Попробуйте позже.")
 
 
+# Фоновая загрузка индекса похожих фото: ссылка держится до завершения
+near_duplicates_warmup = None
+
+def log_warmup_error(future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Не удалось загрузить индекс похожих фото: {future.exception()}")
+
+# Прогрев индекса похожих фото после запуска, не задерживая прием обновлений
+@dp.startup()
+async def on_startup():
+    global near_duplicates_warmup
+    near_duplicates_warmup = asyncio.get_running_loop().run_in_executor(None, get_near_duplicates)
+    near_duplicates_warmup.add_done_callback(log_warmup_error)
+
+
 async def main():
+    # Polling не работает, пока у бота установлен webhook
+    await bot.delete_webhook()
     await dp.start_polling(bot)
 
 
 if __name__ == "__main__":
-    import asyncio
-
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media_files (
+    bot_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (bot_id, kind, path)
+);
+CREATE INDEX IF NOT EXISTS idx_media_files_hash ON media_files (bot_id, kind, sha256);
+"""
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaRegistry:
+    """Кэш file_id для статических файлов, которые бот отправляет повторно.
+
+    Запись привязана к боту (file_id действителен только для своего токена), типу медиа
+    и пути к файлу. Совпадение размера и mtime позволяет не пересчитывать хэш;
+    если файл изменился, хэш сравнивается заново и старый file_id сбрасывается.
+    """
+
+    def __init__(self, db_path: str = "media_cache.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+        self.hits = 0
+        self.uploads = 0
+
+    def lookup(self, bot_id: int, kind: str, path: str):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, sha256, file_id FROM media_files WHERE bot_id = ? AND kind = ? AND path = ?",
+                (bot_id, kind, path),
+            ).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[3]
+
+        # Файл изменился по метаданным (или путь новый) — сверяем содержимое
+        sha256 = file_sha256(path)
+        with self._lock, self._conn:
+            same = self._conn.execute(
+                "SELECT file_id FROM media_files WHERE bot_id = ? AND kind = ? AND sha256 = ? LIMIT 1",
+                (bot_id, kind, sha256),
+            ).fetchone()
+            if same is None:
+                if row is not None:
+                    self._conn.execute(
+                        "DELETE FROM media_files WHERE bot_id = ? AND kind = ? AND path = ?",
+                        (bot_id, kind, path),
+                    )
+                return None
+            self._upsert(bot_id, kind, path, stat, sha256, same[0])
+            return same[0]
+
+    def store(self, bot_id: int, kind: str, path: str, file_id: str) -> None:
+        stat = os.stat(path)
+        sha256 = file_sha256(path)
+        with self._lock, self._conn:
+            self._upsert(bot_id, kind, os.path.abspath(path), stat, sha256, file_id)
+
+    def invalidate(self, bot_id: int, kind: str, path: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM media_files WHERE bot_id = ? AND kind = ? AND path = ?",
+                (bot_id, kind, os.path.abspath(path)),
+            )
+
+    def _upsert(self, bot_id, kind, path, stat, sha256, file_id) -> None:
+        self._conn.execute(
+            """
+            INSERT INTO media_files (bot_id, kind, path, size, mtime_ns, sha256, file_id, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (bot_id, kind, path) DO UPDATE SET
+                size = excluded.size, mtime_ns = excluded.mtime_ns, sha256 = excluded.sha256,
+                file_id = excluded.file_id, updated_at = excluded.updated_at
+            """,
+            (bot_id, kind, path, stat.st_size, stat.st_mtime_ns, sha256, file_id, time.time()),
+        )
+
+    # Отправка файла: по сохраненному file_id, а при его отсутствии или недействительности — загрузкой.
+    # send принимает file_id или FSInputFile, file_id_of достает file_id из отправленного сообщения.
+    async def send(self, bot_id: int, kind: str, path, send, file_id_of):
+        path = str(path)
+        file_id = await asyncio.to_thread(self.lookup, bot_id, kind, path)
+        if file_id is not None:
+            try:
+                result = await send(file_id)
+                self.hits += 1
+                return result
+            except TelegramBadRequest as e:
+                logger.warning(f"Сохраненный file_id для {path} недействителен: {e}")
+                await asyncio.to_thread(self.invalidate, bot_id, kind, path)
+
+        result = await send(FSInputFile(path))
+        self.uploads += 1
+        await asyncio.to_thread(self.store, bot_id, kind, path, file_id_of(result))
+        return result
+
+    def close(self) -> None:
+        self._conn.close()
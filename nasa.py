@@ -1,35 +1,80 @@
 import asyncio
+import logging
 from aiogram import Bot, Dispatcher, F
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import CommandStart, Command
 from aiogram.types import Message
-import random
-import requests
-from datetime import datetime, timedelta
 
+from apod_archive import ApodArchive
 from config import TOKEN, NASA_API_KEY
+from http_client import HTTP_ERRORS, close_session
+from aiogram_rate_limiter import AiogramRateLimitMiddleware
 
 bot = Bot(token=TOKEN)
 dp = Dispatcher()
+# Общие лимиты Telegram на исходящие сообщения
+bot.session.middleware(AiogramRateLimitMiddleware())
 
-def get_random_apod():
-   end_date = datetime.now()
-   start_date = end_date - timedelta(days=365)
-   random_date = start_date + (end_date - start_date) * random.random()
-   date_str = random_date.strftime("%Y-%m-%d")
+# Глубина архива при первой загрузке (лет) и интервал ежедневного пополнения (секунды)
+APOD_BACKFILL_YEARS = 3
+APOD_TOP_UP_INTERVAL = 24 * 3600
+
+# Локальный архив APOD: случайная картинка выбирается без запросов к NASA
+apod_archive = ApodArchive(NASA_API_KEY)
 
-   url = f'https://api.nasa.gov/planetary/apod?api_key={NASA_API_KEY}&date={date_str}'
-   response = requests.get(url)
-   return response.json()
+def get_random_apod():
+   return apod_archive.random_entry()
 
 @dp.message(Command("random_apod"))
 async def random_apod(message: Message):
    apod = get_random_apod()
-   photo_url = apod['url']
+   if apod is None:
+       # Архив еще пуст (первый запуск): подгружаем последние дни одним запросом
+       try:
+           await apod_archive.top_up(days=30)
+       except HTTP_ERRORS as e:
+           logging.error(f"Ошибка API NASA: {e}")
+       apod = get_random_apod()
+       if apod is None:
+           await message.answer("Архив APOD еще загружается, попробуйте позже.")
+           return
+
    title = apod['title']
+   if apod['file_id']:
+       try:
+           await message.answer_photo(photo=apod['file_id'], caption=f"{title}")
+           return
+       except TelegramBadRequest:
+           await apod_archive.set_file_id(apod['date'], None)
+
+   sent = await message.answer_photo(photo=apod['url'], caption=f"{title}")
+   await apod_archive.set_file_id(apod['date'], sent.photo[-1].file_id)
+
+async def keep_archive_updated():
+   await apod_archive.backfill(APOD_BACKFILL_YEARS)
+   while True:
+       await asyncio.sleep(APOD_TOP_UP_INTERVAL)
+       try:
+           await apod_archive.top_up()
+       except HTTP_ERRORS as e:
+           logging.error(f"Не удалось пополнить архив APOD: {e}")
+
+archive_tasks = set()
+
+@dp.startup()
+async def on_startup():
+   archive_tasks.add(asyncio.create_task(keep_archive_updated()))
 
-   await message.answer_photo(photo=photo_url, caption=f"{title}")
+@dp.shutdown()
+async def on_shutdown():
+   for task in archive_tasks:
+       task.cancel()
+   await close_session()
+   apod_archive.close()
 
 async def main():
+   # Polling не работает, пока у бота установлен webhook
+   await bot.delete_webhook()
    await dp.start_polling(bot)
 
 if __name__ == '__main__':
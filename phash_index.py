@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Необязательные зависимости (requirements.txt): без них main_bot работает только с точными дублями
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Максимальное расстояние Хэмминга между dHash, при котором фото считаются одинаковыми
+PHASH_MAX_DISTANCE = int(os.getenv("PHASH_MAX_DISTANCE", 8))
+PHASH_WORKERS = int(os.getenv("PHASH_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS phashes (
+    sha256 TEXT PRIMARY KEY,
+    dhash INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Число единичных битов для каждого байта (для NumPy без bitwise_count)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+# dHash 64 бит: картинка сжимается до 9x8 в оттенках серого, каждый бит — сравнение соседних пикселей.
+# Устойчив к пережатию и изменению размера. Выполняется в процессе пула.
+def dhash(path) -> int:
+    with Image.open(path) as image:
+        # draft ускоряет декодирование JPEG сразу в уменьшенном размере
+        image.draft("L", (64, 64))
+        pixels = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS).tobytes()
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+# Хэш для фоновой загрузки: (sha256 файла, dhash) или None для битых файлов
+def hash_file(path):
+    try:
+        digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+        return digest, dhash(path)
+    except Exception:
+        return None
+
+
+def _to_signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def hamming_distances(hashes: np.ndarray, value: int) -> np.ndarray:
+    xor = hashes ^ np.uint64(value)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor)
+    return _POPCOUNT_TABLE[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+
+class PerceptualIndex:
+    """Компактный индекс dHash: массив uint64 и список ключей той же длины.
+
+    Поиск — векторное XOR и подсчет битов по всему массиву,
+    удаление — перенос последнего элемента на место удаленного.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._hashes = np.zeros(capacity, dtype=np.uint64)
+        self._keys = []
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key, value: int) -> None:
+        with self._lock:
+            position = self._positions.get(key)
+            if position is not None:
+                self._hashes[position] = value
+                return
+            size = len(self._keys)
+            if size == len(self._hashes):
+                grown = np.zeros(max(1024, size * 2), dtype=np.uint64)
+                grown[:size] = self._hashes
+                self._hashes = grown
+            self._hashes[size] = value
+            self._keys.append(key)
+            self._positions[key] = size
+
+    def remove(self, key) -> None:
+        with self._lock:
+            position = self._positions.pop(key, None)
+            if position is None:
+                return
+            last = len(self._keys) - 1
+            if position != last:
+                last_key = self._keys[last]
+                self._hashes[position] = self._hashes[last]
+                self._keys[position] = last_key
+                self._positions[last_key] = position
+            self._keys.pop()
+
+    # Ключи с расстоянием не больше max_distance, ближайшие сначала: [(key, distance), ...]
+    def search(self, value: int, max_distance: int = PHASH_MAX_DISTANCE, limit: int = 10) -> list:
+        with self._lock:
+            size = len(self._keys)
+            if not size:
+                return []
+            distances = hamming_distances(self._hashes[:size], value)
+            matches = np.flatnonzero(distances <= max_distance)
+            if len(matches) > limit:
+                matches = matches[np.argpartition(distances[matches], limit)[:limit]]
+            matches = matches[np.argsort(distances[matches], kind="stable")]
+            return [(self._keys[i], int(distances[i])) for i in matches]
+
+
+class NearDuplicateIndex:
+    """Поиск похожих фото по dHash с хранением хэшей в манифесте хранилища фото."""
+
+    def __init__(self, manifest_path="img/manifest.db", max_distance: int = PHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._conn = sqlite3.connect(manifest_path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+        self.index = PerceptualIndex()
+        for sha256, value in self._conn.execute("SELECT sha256, dhash FROM phashes"):
+            self.index.add(sha256, _to_unsigned(value))
+        self._pool = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=PHASH_WORKERS)
+        return self._pool
+
+    def _store(self, rows) -> None:
+        with self._db_lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO phashes (sha256, dhash) VALUES (?, ?)",
+                [(sha256, _to_signed(value)) for sha256, value in rows],
+            )
+
+    # Хэш нового фото (в пуле процессов), поиск похожих и добавление в индекс.
+    # Возвращает [(sha256, distance), ...] для ранее сохраненных похожих фото.
+    async def check_and_add(self, sha256: str, path) -> list:
+        loop = asyncio.get_running_loop()
+        try:
+            value = await loop.run_in_executor(self._executor(), dhash, str(path))
+        except Exception as e:
+            logger.warning(f"Не удалось вычислить перцептивный хэш {path}: {e}")
+            return []
+        matches = [m for m in self.index.search(value, self.max_distance) if m[0] != sha256]
+        self.index.add(sha256, value)
+        await asyncio.to_thread(self._store, [(sha256, value)])
+        return matches
+
+    def remove(self, sha256: str) -> None:
+        self.index.remove(sha256)
+        with self._db_lock, self._conn:
+            self._conn.execute("DELETE FROM phashes WHERE sha256 = ?", (sha256,))
+
+    # Массовое заполнение индекса по файлам каталога (включая старые файлы img/*.jpg)
+    def backfill(self, root, batch_size: int = 1000) -> int:
+        paths = [str(p) for p in Path(root).rglob("*.jpg")]
+        added = 0
+        with ProcessPoolExecutor(max_workers=PHASH_WORKERS) as pool:
+            rows = []
+            for result in pool.map(hash_file, paths, chunksize=64):
+                if result is None:
+                    continue
+                rows.append(result)
+                if len(rows) >= batch_size:
+                    self._store(rows)
+                    added += len(rows)
+                    rows = []
+            if rows:
+                self._store(rows)
+                added += len(rows)
+        for sha256, value in self._conn.execute("SELECT sha256, dhash FROM phashes"):
+            self.index.add(sha256, _to_unsigned(value))
+        return added
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    # Заполнение индекса по существующим фото: python phash_index.py [img]
+    logging.basicConfig(level=logging.INFO)
+    root = Path(sys.argv[1] if len(sys.argv) > 1 else "img")
+    near_duplicates = NearDuplicateIndex(root / "manifest.db")
+    count = near_duplicates.backfill(root)
+    logger.info(f"Перцептивные хэши вычислены для {count} файлов")
+    near_duplicates.close()
@@ -0,0 +1,328 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", 64 * 1024))
+DOWNLOAD_TIMEOUT = int(os.getenv("DOWNLOAD_TIMEOUT", 60))
+MAX_CONCURRENT_DOWNLOADS = int(os.getenv("MAX_CONCURRENT_DOWNLOADS", 4))
+
+# Бюджет хранилища фото в байтах (0 — без ограничения) и политика вытеснения: lru или oldest
+IMG_STORE_MAX_BYTES = int(os.getenv("IMG_STORE_MAX_BYTES", 0))
+IMG_STORE_EVICTION = os.getenv("IMG_STORE_EVICTION", "lru")
+# Вытеснение идет до этой доли бюджета, чтобы не запускаться на каждом новом фото
+IMG_STORE_LOW_WATERMARK = float(os.getenv("IMG_STORE_LOW_WATERMARK", 0.9))
+
+# Ограничение числа одновременных скачиваний
+_download_slots = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+
+
+# Потоковое скачивание во временный файл рядом с destination_dir.
+# Запись кусками в пуле потоков, одновременно считается SHA-256. Возвращает (tmp_path, sha256, size).
+async def _stream_to_temp(bot, file_id: str, destination_dir: Path):
+    async with _download_slots:
+        file = await bot.get_file(file_id)
+        url = bot.session.api.file_url(bot.token, file.file_path)
+        tmp_path = destination_dir / f".{uuid.uuid4().hex}.part"
+        digest = hashlib.sha256()
+        size = 0
+
+        f = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            async for chunk in bot.session.stream_content(
+                url=url,
+                timeout=DOWNLOAD_TIMEOUT,
+                chunk_size=DOWNLOAD_CHUNK_SIZE,
+                raise_for_status=True,
+            ):
+                digest.update(chunk)
+                size += len(chunk)
+                await asyncio.to_thread(f.write, chunk)
+            await asyncio.to_thread(f.close)
+        except BaseException:
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(tmp_path.unlink, True)
+            raise
+    return tmp_path, digest.hexdigest(), size
+
+
+MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS file_uniques (
+    file_unique_id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL REFERENCES blobs (sha256)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS messages (
+    chat_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    user_id INTEGER,
+    file_unique_id TEXT,
+    sha256 TEXT NOT NULL REFERENCES blobs (sha256),
+    saved_at REAL NOT NULL,
+    PRIMARY KEY (chat_id, message_id)
+) WITHOUT ROWID;
+"""
+
+# Расположение файла относительно корня хранилища: ab/cd/<sha256>.jpg
+def relative_blob_path(sha256: str, suffix: str = ".jpg") -> str:
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{suffix}"
+
+
+# То же расположение выражением SQL (для перевода путей старых манифестов)
+RELATIVE_PATH_SQL = "substr(sha256, 1, 2) || '/' || substr(sha256, 3, 2) || '/' || sha256 || '.jpg'"
+
+MANIFEST_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_blobs_last_access ON blobs (last_access);
+CREATE INDEX IF NOT EXISTS idx_blobs_created_at ON blobs (created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_sha256 ON messages (sha256);
+CREATE INDEX IF NOT EXISTS idx_file_uniques_sha256 ON file_uniques (sha256);
+"""
+
+
+class PhotoStore:
+    """Хранилище фото с адресацией по содержимому.
+
+    Файл лежит один раз под своим SHA-256 в подкаталогах img/ab/cd/,
+    манифест SQLite связывает сообщения и file_unique_id с файлами.
+    Пути в манифесте хранятся относительно корня хранилища, поэтому не зависят от рабочего каталога.
+    Если file_unique_id уже известен, скачивание не выполняется.
+
+    Размер и время последнего обращения каждого файла хранятся в манифесте.
+    Общий объем пересчитывается по манифесту после записи нового файла и перед
+    вытеснением, поэтому верен и для нескольких экземпляров над одним каталогом
+    (main.py и main_bot.py). При превышении max_bytes фоновая задача удаляет
+    давно не использованные (lru) или самые старые (oldest) файлы.
+    """
+
+    def __init__(self, root="img", manifest_path=None, max_bytes: int = IMG_STORE_MAX_BYTES,
+                 eviction: str = IMG_STORE_EVICTION):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = Path(manifest_path) if manifest_path else self.root / "manifest.db"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.manifest_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(MANIFEST_SCHEMA)
+            # Манифесты без учета обращений получают колонку last_access
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(blobs)")}
+            if "last_access" not in columns:
+                self._conn.execute("ALTER TABLE blobs ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+                self._conn.execute("UPDATE blobs SET last_access = created_at")
+            self._conn.executescript(MANIFEST_INDEXES)
+            # Старые манифесты хранили пути относительно рабочего каталога (img/ab/cd/...)
+            self._conn.execute(f"UPDATE blobs SET path = {RELATIVE_PATH_SQL} WHERE path != {RELATIVE_PATH_SQL}")
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+        self.usage_bytes = self._usage()
+        self._eviction_task = None
+        # Функции, вызываемые с sha256 удаленного файла (например, для очистки других индексов)
+        self.on_evict = []
+        self.downloads = 0
+        self.skipped_downloads = 0
+        self.deduplicated = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    # Объем всех файлов по манифесту (вызывается под self._lock или до начала работы)
+    def _usage(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def blob_path(self, sha256: str, suffix: str = ".jpg") -> Path:
+        return self.root / relative_blob_path(sha256, suffix)
+
+    # Путь из манифеста -> путь к файлу
+    def _resolve(self, stored_path: str) -> Path:
+        return self.root / stored_path
+
+    def _find_by_unique_id(self, file_unique_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT b.sha256, b.path FROM file_uniques AS u
+                JOIN blobs AS b ON b.sha256 = u.sha256
+                WHERE u.file_unique_id = ?
+                """,
+                (file_unique_id,),
+            ).fetchone()
+        if row is not None:
+            path = self._resolve(row[1])
+            if path.exists():
+                self._touch(row[0])
+                return row[0], path
+        return None
+
+    def _touch(self, sha256: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE blobs SET last_access = ? WHERE sha256 = ?", (time.time(), sha256))
+
+    def _record_message(self, chat_id, message_id, user_id, file_unique_id, sha256) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO messages (chat_id, message_id, user_id, file_unique_id, sha256, saved_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (chat_id, message_id, user_id, file_unique_id, sha256, time.time()),
+            )
+
+    # Перенос скачанного файла в хранилище. Возвращает (путь, новый ли это файл).
+    def _commit_blob(self, tmp_path: Path, sha256: str, size: int, file_unique_id: str):
+        path = self.blob_path(sha256)
+        with self._lock:
+            row = self._conn.execute("SELECT path, size FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            is_new = row is None or not self._resolve(row[0]).exists()
+            if is_new:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, path)
+            else:
+                tmp_path.unlink(missing_ok=True)
+                path = self._resolve(row[0])
+            now = time.time()
+            with self._conn:
+                self._conn.execute(
+                    """
+                    INSERT INTO blobs (sha256, path, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (sha256) DO UPDATE SET
+                        path = excluded.path, size = excluded.size, last_access = excluded.last_access
+                    """,
+                    (sha256, path.relative_to(self.root).as_posix(), size, now, now),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO file_uniques (file_unique_id, sha256) VALUES (?, ?)",
+                    (file_unique_id, sha256),
+                )
+            if is_new:
+                # Счетчик меняется на разницу размеров: без полного SUM(size) на каждое фото.
+                # С таблицей он сверяется при запуске и в начале вытеснения.
+                self.usage_bytes += size - (row[1] if row is not None else 0)
+        return path, is_new
+
+    # Сохранение фото из сообщения aiogram. Возвращает (путь к файлу, новый ли это файл).
+    async def save(self, bot, message):
+        photo = message.photo[-1]
+        user_id = message.from_user.id if message.from_user else None
+
+        known = await asyncio.to_thread(self._find_by_unique_id, photo.file_unique_id)
+        if known is not None:
+            sha256, path = known
+            self.skipped_downloads += 1
+            await asyncio.to_thread(
+                self._record_message, message.chat.id, message.message_id, user_id, photo.file_unique_id, sha256
+            )
+            return path, False
+
+        tmp_path, sha256, size = await _stream_to_temp(bot, photo.file_id, self.root)
+        self.downloads += 1
+        try:
+            path, is_new = await asyncio.to_thread(self._commit_blob, tmp_path, sha256, size, photo.file_unique_id)
+        except BaseException:
+            await asyncio.to_thread(tmp_path.unlink, True)
+            raise
+        if not is_new:
+            self.deduplicated += 1
+        await asyncio.to_thread(
+            self._record_message, message.chat.id, message.message_id, user_id, photo.file_unique_id, sha256
+        )
+        if is_new:
+            self._schedule_eviction()
+        return path, is_new
+
+    def _schedule_eviction(self) -> None:
+        if not self.max_bytes or self.usage_bytes <= self.max_bytes:
+            return
+        if self._eviction_task is None or self._eviction_task.done():
+            self._eviction_task = asyncio.create_task(asyncio.to_thread(self.evict))
+
+    # Удаление файлов, пока объем не опустится до нижней границы. Файлы выбираются
+    # по индексу манифеста (last_access или created_at), каталог не сканируется.
+    # Файлы, которые не удалось удалить (нет прав, файл занят), пропускаются до следующего вытеснения.
+    def evict(self) -> int:
+        if not self.max_bytes:
+            return 0
+        target = self.max_bytes * IMG_STORE_LOW_WATERMARK
+        order_column = "created_at" if self.eviction == "oldest" else "last_access"
+        removed = 0
+        failed = set()
+        with self._lock:
+            # Другой экземпляр над тем же манифестом мог добавить или удалить файлы
+            self.usage_bytes = self._usage()
+        while self.usage_bytes > target:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT sha256, path, size FROM blobs ORDER BY {order_column} LIMIT ?",
+                    (len(failed) + 100,),
+                ).fetchall()
+            candidates = [row for row in rows if row[0] not in failed]
+            if not candidates:
+                break
+            for sha256, path, size in candidates:
+                try:
+                    os.remove(self._resolve(path))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Не удалось удалить {path}: {e}")
+                    failed.add(sha256)
+                    continue
+                with self._lock, self._conn:
+                    self._conn.execute("DELETE FROM messages WHERE sha256 = ?", (sha256,))
+                    self._conn.execute("DELETE FROM file_uniques WHERE sha256 = ?", (sha256,))
+                    self._conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+                    self.usage_bytes -= size
+                for callback in self.on_evict:
+                    callback(sha256)
+                self.evictions += 1
+                self.evicted_bytes += size
+                removed += 1
+                if self.usage_bytes <= target:
+                    break
+        if failed:
+            logger.warning(f"Хранилище фото: не удалось удалить {len(failed)} файлов, занято {self.usage_bytes} байт")
+        if removed:
+            logger.info(f"Хранилище фото: удалено {removed} файлов, занято {self.usage_bytes} байт")
+        return removed
+
+    # Присылал ли пользователь хотя бы одно из этих фото
+    def user_has_sent(self, user_id: int, sha256_list) -> bool:
+        sha256_list = list(sha256_list)
+        if not sha256_list:
+            return False
+        placeholders = ", ".join("?" for _ in sha256_list)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM messages WHERE user_id = ? AND sha256 IN ({placeholders}) LIMIT 1",
+                [user_id, *sha256_list],
+            ).fetchone()
+        return row is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            blobs = self._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+        return {
+            "blobs": blobs,
+            "usage_bytes": self.usage_bytes,
+            "max_bytes": self.max_bytes,
+            "downloads": self.downloads,
+            "skipped_downloads": self.skipped_downloads,
+            "deduplicated": self.deduplicated,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+        }
+
+    def close(self) -> None:
+        self._conn.close()
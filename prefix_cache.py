@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+
+
+# Каждое слово запроса — начало какого-либо слова названия
+def name_matches(name: str, tokens: list) -> bool:
+    words = name.casefold().split()
+    return all(any(word.startswith(token) for word in words) for token in tokens)
+
+
+# Запрос подходит к сериалу, если подходит к любому из его названий (API ищет по всем)
+def series_matches(series, tokens: list) -> bool:
+    names = (series.name, series.alternative_name, series.en_name)
+    return any(name_matches(name, tokens) for name in names if name)
+
+
+class PrefixResultCache:
+    """Кэш результатов поиска при наборе текста (inline-режим).
+
+    Кроме точного совпадения запроса используется самый длинный закэшированный префикс:
+    если для «break» известен полный список результатов, ответ для «breaking»
+    получается фильтрацией этого списка без запроса к API.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # запрос -> (результаты, полный ли список, время истечения)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+    # complete=True — results содержат все совпадения (полный ответ API), их можно фильтровать
+    def put(self, query: str, results, complete: bool) -> None:
+        self._entries[query] = (tuple(results), complete, time.monotonic() + self.ttl)
+        self._entries.move_to_end(query)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _fresh(self, query: str):
+        entry = self._entries.get(query)
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            del self._entries[query]
+            return None
+        self._entries.move_to_end(query)
+        return entry
+
+    # query — нормализованный запрос; None, если без обращения к API не ответить
+    def get(self, query: str):
+        entry = self._fresh(query)
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+
+        tokens = query.split()
+        for length in range(len(query) - 1, 0, -1):
+            entry = self._fresh(query[:length])
+            if entry is None:
+                continue
+            results, complete, _ = entry
+            if not complete:
+                continue
+            self.prefix_hits += 1
+            filtered = tuple(series for series in results if series_matches(series, tokens))
+            self.put(query, filtered, complete=True)
+            return filtered
+        self.misses += 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "prefix_hits": self.prefix_hits,
+            "misses": self.misses,
+        }
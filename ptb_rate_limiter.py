@@ -0,0 +1,27 @@
+from telegram.ext import BaseRateLimiter
+
+from send_scheduler import RATE_LIMITED_METHODS, OutboundScheduler, outbound
+
+
+class PTBRateLimiter(BaseRateLimiter):
+    """Rate limiter для python-telegram-bot поверх общего планировщика.
+
+    Подключается через Application.builder().rate_limiter(...).
+    """
+
+    def __init__(self, bot_key, scheduler: OutboundScheduler = outbound):
+        self.bot_key = bot_key
+        self.scheduler = scheduler
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        if chat_id is None or endpoint.lower() not in RATE_LIMITED_METHODS:
+            return await callback(*args, **kwargs)
+        priority = rate_limit_args if isinstance(rate_limit_args, int) else None
+        return await self.scheduler.submit(self.bot_key, chat_id, lambda: callback(*args, **kwargs), priority)
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import os
+import queue
+import signal
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from dotenv import load_dotenv
+
+from bot_routes import AiogramRoute, load_route, unique_routes
+from http_client import close_session
+
+# Запуск нескольких ботов в одном процессе: python run_bots.py [serial_poisk cats ...]
+load_dotenv()
+# Какие боты запускать (имена модулей через запятую)
+ENABLED_BOTS = os.getenv("ENABLED_BOTS", "serial_poisk")
+# polling или webhook (см. webhook_server.py)
+RUN_MODE = os.getenv("RUN_MODE", "polling")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+logger = logging.getLogger(__name__)
+
+
+# Общий конвейер логов: обработчики всех ботов только кладут записи в очередь,
+# форматирование и вывод выполняются в отдельном потоке
+def setup_logging() -> QueueListener:
+    log_queue = queue.SimpleQueue()
+    output = logging.StreamHandler()
+    output.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+    root = logging.getLogger()
+    # Обработчик на корневом логгере делает logging.basicConfig в модулях ботов пустой операцией
+    root.handlers[:] = [QueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+    listener.start()
+    return listener
+
+
+# Одна сессия aiogram (пул соединений к Bot API) для всех aiogram-ботов.
+# Лимиты отправки подключаются к ней один раз; очередь send_scheduler.outbound и так общая в процессе.
+def share_aiogram_session(routes):
+    aiogram_routes = [route for route in routes if isinstance(route, AiogramRoute)]
+    if not aiogram_routes:
+        return None
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram_rate_limiter import AiogramRateLimitMiddleware
+
+    session = AiohttpSession()
+    session.middleware(AiogramRateLimitMiddleware())
+    for route in aiogram_routes:
+        route.bot.session = session
+        route.close_session = False
+    return session
+
+
+async def run(names, mode: str = RUN_MODE) -> None:
+    routes = unique_routes([load_route(name) for name in names])
+    if not routes:
+        logger.error("Нет ботов для запуска: проверьте ENABLED_BOTS")
+        return
+    session = share_aiogram_session(routes)
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
+    server = None
+    started = []
+    try:
+        if mode == "webhook":
+            from webhook_server import WebhookServer
+
+            server = WebhookServer(routes)
+            await server.start()
+        else:
+            for route in routes:
+                await route.start_polling()
+                started.append(route)
+        logger.info(f"Запущены боты ({mode}): {', '.join(route.name for route in routes)}")
+        await stop_event.wait()
+    finally:
+        if server is not None:
+            await server.stop()
+        for route in reversed(started):
+            try:
+                await route.stop()
+            except Exception as e:
+                logger.warning(f"Ошибка при остановке {route.name}: {e}")
+        if session is not None:
+            await session.close()
+        # Хуки остановки ботов могли закрыть и заново открыть общую HTTP-сессию
+        await close_session()
+
+
+if __name__ == "__main__":
+    listener = setup_logging()
+    bot_names = sys.argv[1:] or [name.strip() for name in ENABLED_BOTS.split(",") if name.strip()]
+    try:
+        asyncio.run(run(bot_names))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.stop()
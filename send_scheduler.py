@@ -0,0 +1,372 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты: ответы пользователю отправляются раньше массовых рассылок
+INTERACTIVE = 0
+BULK = 1
+
+# Лимиты Telegram: ~30 сообщений в секунду на бота, ~1 в секунду в личный чат, ~20 в минуту в группу
+GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "30"))
+PRIVATE_CHAT_RATE = float(os.getenv("TG_PRIVATE_CHAT_RATE", "1"))
+GROUP_CHAT_RATE = float(os.getenv("TG_GROUP_CHAT_RATE", str(20 / 60)))
+CHAT_BURST = float(os.getenv("TG_CHAT_BURST", "3"))
+MAX_RETRIES = int(os.getenv("TG_SEND_MAX_RETRIES", "3"))
+
+# Методы, которые отправляют что-то в чат и попадают под лимиты
+RATE_LIMITED_METHODS = {
+    "sendmessage", "sendphoto", "sendaudio", "senddocument", "sendvideo", "sendanimation",
+    "sendvoice", "sendvideonote", "sendmediagroup", "sendlocation", "sendvenue", "sendcontact",
+    "sendpoll", "senddice", "sendsticker", "copymessage", "forwardmessage",
+    "editmessagetext", "editmessagecaption", "editmessagemedia", "editmessagereplymarkup",
+}
+
+_priority = contextvars.ContextVar("send_priority", default=INTERACTIVE)
+
+
+# Все отправки внутри блока получают низкий приоритет
+@contextmanager
+def bulk_sends():
+    token = _priority.set(BULK)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+# Ключ бота для лимитов: числовой id из токена (часть до двоеточия)
+def bot_key(token: str) -> str:
+    return (token or "").split(":", 1)[0]
+
+
+def _seconds(value) -> float:
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Через сколько секунд будет доступен токен (0 — уже доступен)
+    def delay(self, now: float) -> float:
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class OutboundScheduler:
+    """Общий планировщик исходящих сообщений Telegram.
+
+    Для каждого бота действует общий token bucket, для каждого чата — свой.
+    Сообщения чата лежат в его собственной куче по (приоритет, порядок). Готовые к отправке
+    чаты бота собраны в кучу по первому сообщению, боты — в кучу по лучшему готовому чату.
+    Чат или бот, упершийся в лимит, откладывается до момента, когда появится токен,
+    поэтому медленный чат не задерживает остальных, а выбор сообщения стоит O(log n).
+    При 429 отправка повторяется после retry_after.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, private_rate: float = PRIVATE_CHAT_RATE,
+                 group_rate: float = GROUP_CHAT_RATE, chat_burst: float = CHAT_BURST,
+                 max_retries: int = MAX_RETRIES):
+        self.global_rate = global_rate
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._seq = itertools.count()
+        # (бот, чат) -> куча сообщений: (priority, seq, bot_key, chat_id, call, future, attempt)
+        self._chats = {}
+        # бот -> куча готовых чатов: (priority, seq, token, chat_id)
+        self._ready = {}
+        # Куча ботов с готовыми чатами: (priority, seq, token, bot_key)
+        self._bots = []
+        # Куча отложенных до появления токена: (время, token, bot_key, chat_id); chat_id None — весь бот
+        self._delayed = []
+        # Действующая запись чата/бота в кучах: записи с другим token устарели и пропускаются
+        self._chat_tokens = {}
+        self._bot_entries = {}
+        self._delayed_chats = set()
+        self._delayed_bots = set()
+        self._tokens = itertools.count()
+        self._queued = 0
+        self._global_buckets = {}
+        self._chat_buckets = {}
+        # Пауза чата после 429: (бот, чат) -> время окончания
+        self._paused_until = {}
+        self._tasks = set()
+        self._wakeup = None
+        self._worker = None
+        self._in_flight = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def stats(self) -> dict:
+        by_priority = {INTERACTIVE: 0, BULK: 0}
+        for chat in self._chats.values():
+            for item in chat:
+                by_priority[item[0]] = by_priority.get(item[0], 0) + 1
+        return {
+            "queued": self._queued,
+            "queued_interactive": by_priority[INTERACTIVE],
+            "queued_bulk": by_priority[BULK],
+            "in_flight": self._in_flight,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    # Поставить отправку в очередь и дождаться ее результата.
+    # call — функция без аргументов, возвращающая корутину запроса к Bot API.
+    async def submit(self, bot_key, chat_id, call, priority: int = None):
+        if priority is None:
+            priority = _priority.get()
+        future = asyncio.get_running_loop().create_future()
+        self._push((priority, next(self._seq), bot_key, chat_id, call, future, 0))
+        return await future
+
+    def _push(self, item) -> None:
+        key = (item[2], item[3])
+        chat = self._chats.setdefault(key, [])
+        heapq.heappush(chat, item)
+        self._queued += 1
+        # Отложенный чат встанет в очередь со своим первым сообщением, когда появится токен
+        if chat[0] is item and key not in self._delayed_chats:
+            self._schedule_chat(key)
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    # Чат готов к отправке: новая запись в куче готовых чатов его бота
+    def _schedule_chat(self, key) -> None:
+        bot_key, chat_id = key
+        head = self._chats[key][0]
+        token = next(self._tokens)
+        self._chat_tokens[key] = token
+        heapq.heappush(self._ready.setdefault(bot_key, []), (head[0], head[1], token, chat_id))
+        self._schedule_bot(bot_key)
+
+    # Запись бота в куче ботов по его лучшему готовому чату (если текущая запись не лучше)
+    def _schedule_bot(self, bot_key) -> None:
+        if bot_key in self._delayed_bots:
+            return
+        ready = self._ready.get(bot_key)
+        while ready and self._chat_tokens.get((bot_key, ready[0][3])) != ready[0][2]:
+            heapq.heappop(ready)
+        if not ready:
+            self._ready.pop(bot_key, None)
+            return
+        priority, seq = ready[0][0], ready[0][1]
+        entry = self._bot_entries.get(bot_key)
+        if entry is not None and entry[:2] <= (priority, seq):
+            return
+        token = next(self._tokens)
+        self._bot_entries[bot_key] = (priority, seq, token)
+        heapq.heappush(self._bots, (priority, seq, token, bot_key))
+
+    def _delay(self, bot_key, chat_id, until: float) -> None:
+        token = next(self._tokens)
+        if chat_id is None:
+            self._delayed_bots.add(bot_key)
+            self._bot_entries[bot_key] = (None, None, token)
+        else:
+            self._delayed_chats.add((bot_key, chat_id))
+            self._chat_tokens[(bot_key, chat_id)] = token
+        heapq.heappush(self._delayed, (until, token, bot_key, chat_id))
+
+    # Возврат в очередь чатов и ботов, для которых уже появился токен
+    def _release_delayed(self, now: float) -> None:
+        while self._delayed and self._delayed[0][0] <= now:
+            _, token, bot_key, chat_id = heapq.heappop(self._delayed)
+            if chat_id is None:
+                if self._bot_entries.get(bot_key, (None, None, None))[2] == token:
+                    self._delayed_bots.discard(bot_key)
+                    del self._bot_entries[bot_key]
+                    self._schedule_bot(bot_key)
+                continue
+            key = (bot_key, chat_id)
+            if self._chat_tokens.get(key) == token:
+                self._delayed_chats.discard(key)
+                if self._chats.get(key):
+                    self._schedule_chat(key)
+                else:
+                    del self._chat_tokens[key]
+
+    # Бот с лучшим готовым чатом или None
+    def _pop_bot(self):
+        while self._bots:
+            priority, seq, token, bot_key = heapq.heappop(self._bots)
+            entry = self._bot_entries.get(bot_key)
+            if entry is not None and entry[2] == token:
+                del self._bot_entries[bot_key]
+                return bot_key
+        return None
+
+    # Готовый чат бота с лучшим первым сообщением или None.
+    # Запись чата используется: следующая появится после выбора сообщения.
+    def _pop_ready_chat(self, bot_key):
+        ready = self._ready.get(bot_key)
+        while ready:
+            _, _, token, chat_id = heapq.heappop(ready)
+            if self._chat_tokens.get((bot_key, chat_id)) == token:
+                del self._chat_tokens[(bot_key, chat_id)]
+                return chat_id
+        self._ready.pop(bot_key, None)
+        return None
+
+    # Первое сообщение чата, пропуская отмененные (они не расходуют лимит)
+    def _chat_head(self, key):
+        chat = self._chats.get(key)
+        while chat and chat[0][5].cancelled():
+            heapq.heappop(chat)
+            self._queued -= 1
+            self.dropped += 1
+        if not chat:
+            self._chats.pop(key, None)
+            self._chat_tokens.pop(key, None)
+            return None
+        return chat[0]
+
+    async def _run(self) -> None:
+        while self._queued:
+            now = time.monotonic()
+            self._release_delayed(now)
+            bot_key = self._pop_bot()
+            if bot_key is None:
+                self._wakeup.clear()
+                wait = self._delayed[0][0] - now if self._delayed else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            global_delay = self._global_bucket(bot_key).delay(now)
+            if global_delay > 0:
+                self._delay(bot_key, None, now + global_delay)
+                continue
+
+            chat_id = self._pop_ready_chat(bot_key)
+            if chat_id is None:
+                continue
+            key = (bot_key, chat_id)
+            head = self._chat_head(key)
+            if head is None:
+                self._schedule_bot(bot_key)
+                continue
+
+            chat_delay = max(self._paused_until.get(key, 0.0) - now, self._chat_bucket(bot_key, chat_id).delay(now))
+            if chat_delay > 0:
+                self._delay(bot_key, chat_id, now + chat_delay)
+                self._schedule_bot(bot_key)
+                continue
+
+            item = heapq.heappop(self._chats[key])
+            self._queued -= 1
+            if self._chats[key]:
+                self._schedule_chat(key)
+            else:
+                del self._chats[key]
+                self._schedule_bot(bot_key)
+            self._global_bucket(bot_key).consume()
+            self._chat_bucket(bot_key, chat_id).consume()
+            self._in_flight += 1
+            task = asyncio.create_task(self._send(item))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            self._cleanup(now)
+        self._worker = None
+
+    def _chat_bucket(self, bot_key, chat_id) -> TokenBucket:
+        key = (bot_key, chat_id)
+        bucket = self._chat_buckets.get(key)
+        if bucket is None:
+            is_group = isinstance(chat_id, str) or (isinstance(chat_id, int) and chat_id < 0)
+            rate = self.group_rate if is_group else self.private_rate
+            bucket = self._chat_buckets[key] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    def _global_bucket(self, bot_key) -> TokenBucket:
+        bucket = self._global_buckets.get(bot_key)
+        if bucket is None:
+            bucket = self._global_buckets[bot_key] = TokenBucket(self.global_rate, self.global_rate)
+        return bucket
+
+    async def _send(self, item) -> None:
+        priority, seq, bot_key, chat_id, call, future, attempt = item
+        if future.cancelled():
+            self._in_flight -= 1
+            return
+        try:
+            result = await call()
+        except Exception as e:
+            retry_after = getattr(e, "retry_after", None)
+            if retry_after is not None and attempt < self.max_retries and not future.cancelled():
+                delay = _seconds(retry_after)
+                self.retried += 1
+                logger.warning(f"Flood limit для чата {chat_id}: повтор через {delay:.0f} с")
+                pause_key = (bot_key, chat_id)
+                self._paused_until[pause_key] = max(
+                    self._paused_until.get(pause_key, 0.0), time.monotonic() + delay
+                )
+                # Сохраняем исходный seq, чтобы сообщение не потеряло место в очереди
+                self._push((priority, seq, bot_key, chat_id, call, future, attempt + 1))
+            else:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            self.sent += 1
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self._in_flight -= 1
+
+    # Удаление полных и неиспользуемых корзин чатов, чтобы словарь не рос бесконечно
+    def _cleanup(self, now: float) -> None:
+        if len(self._chat_buckets) < 10_000:
+            return
+        for key in [k for k, b in self._chat_buckets.items() if k not in self._chats and b.is_full(now)]:
+            del self._chat_buckets[key]
+        for key in [k for k, until in self._paused_until.items() if until < now]:
+            del self._paused_until[key]
+
+
+# Общий планировщик для всех ботов процесса.
+# Адаптеры к фреймворкам — в ptb_rate_limiter.py и aiogram_rate_limiter.py:
+# каждый бот импортирует только свой фреймворк.
+outbound = OutboundScheduler()
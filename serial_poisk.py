@@ -1,19 +1,43 @@
+import asyncio
+import html
+import json
 import logging
 import os
+import time
+from pathlib import Path
 from dotenv import load_dotenv
 from telegram import (
     Update,
     ReplyKeyboardMarkup,
     KeyboardButton,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputMediaPhoto,
+    InputTextMessageContent,
+    LinkPreviewOptions,
 )
 from telegram.ext import (
     Application,
+    CallbackQueryHandler,
     CommandHandler,
+    InlineQueryHandler,
     MessageHandler,
     ContextTypes,
     filters,
 )
-import requests
+from telegram.error import BadRequest
+from batch_loader import BatchLoader
+from cache import ResponseCache
+from http_client import HTTP_ERRORS, fetch_json, close_session
+from favorites import FavoritesStore
+from prefix_cache import PrefixResultCache
+from ptb_rate_limiter import PTBRateLimiter
+from send_scheduler import bot_key, bulk_sends, outbound
+from series_catalog import SeriesCatalog
+from series_record import SERIES_FIELDS, Series, series_from_docs
+from sqlite_persistence import SQLitePersistence
+from singleflight import SingleFlight, make_key
 
 # Загрузка переменных окружения
 load_dotenv()
@@ -38,75 +62,269 @@ def get_main_keyboard():
         input_field_placeholder="Выберите действие"
     )
 
-# Получение информации о сериале
-async def get_series_info(series_id: int):
-    url = f"https://api.kinopoisk.dev/v1.4/movie/{series_id}"
+KINOPOISK_BASE_URL = "https://api.kinopoisk.dev/v1.4"
+
+# Время жизни кэша по эндпоинтам (секунды)
+CACHE_TTL = {
+    "movie": int(os.getenv("CACHE_TTL_MOVIE", 6 * 3600)),
+    "search": int(os.getenv("CACHE_TTL_SEARCH", 30 * 60)),
+    "top": int(os.getenv("CACHE_TTL_TOP", 3600)),
+}
+
+# Кэш ответов Кинопоиска: LRU по числу записей и объему, устаревшие данные отдаются во время обновления
+kinopoisk_cache = ResponseCache(
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", 2000)),
+    max_bytes=int(os.getenv("CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    stale_ttl=int(os.getenv("CACHE_STALE_TTL", 24 * 3600)),
+)
+
+# База с каталогом сериалов и избранным
+SERIES_DB_PATH = os.getenv("SERIES_DB_PATH", "series_bot.db")
+
+# Локальный каталог сериалов с полнотекстовым индексом: поиск без обращения к API.
+# Открывается в post_init вместе с избранным, а не при импорте модуля.
+catalog = None
+
+# Сохранение полученных документов в каталог (в пуле потоков, чтобы не блокировать event loop)
+async def store_in_catalog(data) -> None:
+    if catalog is None:
+        return
+    docs = data.get("docs", []) if isinstance(data, dict) and "docs" in data else [data]
+    try:
+        await asyncio.to_thread(catalog.upsert_many, docs)
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить сериалы в каталог: {e}")
+
+# Избранное пользователей (пакетная запись в series_bot.db).
+# Открывается в post_init: миграция схемы не выполняется при импорте модуля.
+favorites = None
+
+# Одинаковые одновременные запросы к Кинопоиску выполняются один раз
+kinopoisk_flight = SingleFlight()
+
+# GET-запрос к API Кинопоиска через кэш и объединение одинаковых запросов.
+# refresh=True обходит кэш и записывает свежий ответ (используется фоновыми задачами).
+# decode превращает ответ в компактные записи до записи в кэш.
+async def kinopoisk_get(endpoint: str, path: str, params: dict = None, refresh: bool = False, decode=None):
+    url = f"{KINOPOISK_BASE_URL}{path}"
     headers = {"X-API-KEY": KINOPOISK_API_KEY}
+    key = make_key(path, params)
+
+    async def request():
+        data = await fetch_json(url, headers=headers, params=params, timeout=10)
+        await store_in_catalog(data)
+        return decode(data) if decode else data
+
+    def fetch():
+        return kinopoisk_flight.do(key, request)
+
+    if refresh:
+        return await kinopoisk_cache.refresh(key, fetch, ttl=CACHE_TTL[endpoint])
+    return await kinopoisk_cache.get_or_fetch(key, fetch, ttl=CACHE_TTL[endpoint])
+
+# Нормализация поискового запроса (регистр и лишние пробелы не влияют на результат)
+def normalize_query(query: str) -> str:
+    return " ".join(query.split()).casefold()
+
+# Загрузка нескольких сериалов одним запросом /movie?id=...&id=... (только нужные поля через selectFields)
+async def load_series_batch(series_ids: list) -> dict:
+    params = {
+        "id": series_ids,
+        "limit": len(series_ids),
+        "selectFields": SERIES_FIELDS
+    }
+    headers = {"X-API-KEY": KINOPOISK_API_KEY}
+    data = await fetch_json(f"{KINOPOISK_BASE_URL}/movie", headers=headers, params=params, timeout=10)
+    await store_in_catalog(data)
+    return {series.id: series for series in series_from_docs(data)}
+
+# Запросы подробностей, пришедшие почти одновременно, объединяются в один запрос к API
+series_loader = BatchLoader(
+    load_series_batch,
+    window=float(os.getenv("SERIES_BATCH_WINDOW", 0.01)),
+    max_batch=int(os.getenv("SERIES_BATCH_SIZE", 50)),
+)
+
+# Получение информации о сериале: из кэша, а при промахе — через пакетный загрузчик
+async def get_series_info(series_id: int, refresh: bool = False):
+    key = make_key("/movie", {"id": series_id})
+
+    def fetch():
+        return series_loader.load(series_id)
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        if refresh:
+            return await kinopoisk_cache.refresh(key, fetch, ttl=CACHE_TTL["movie"])
+        return await kinopoisk_cache.get_or_fetch(key, fetch, ttl=CACHE_TTL["movie"])
+    except HTTP_ERRORS as e:
         logger.error(f"Ошибка API: {e}")
         return None
 
-# Поиск сериалов по названию
-async def search_series(query: str):
-    url = "https://api.kinopoisk.dev/v1.4/movie/search"
-    headers = {"X-API-KEY": KINOPOISK_API_KEY}
-    params = {
-        "page": 1,
-        "limit": 5,
-        "query": query,
+# Размер страницы результатов поиска
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", 5))
+
+# Ответ поиска -> (записи страницы, всего страниц)
+def decode_search_page(data) -> tuple:
+    return series_from_docs(data), (data or {}).get("pages") or 1
+
+# Параметры запроса страницы поиска к API
+def search_params(query: str, page: int, limit: int) -> dict:
+    return {
+        "page": page,
+        "limit": limit,
+        "query": normalize_query(query),
         "type": "tv-series"
     }
 
+# Первая страница из локального каталога (в пуле потоков): (сериалы, уверенный ли ответ).
+# Ответ уверенный, только если каталог заполнил страницу целиком.
+async def search_local_page(query: str, limit: int = SEARCH_PAGE_SIZE):
+    if catalog is None:
+        return (), False
+    docs, confident = await asyncio.to_thread(catalog.search, query, limit)
+    return tuple(Series.from_doc(doc) for doc in docs), confident
+
+# Страница результатов поиска из API: (сериалы, всего страниц). Ошибки пробрасываются.
+async def fetch_search_page(query: str, page: int = 1, limit: int = SEARCH_PAGE_SIZE):
+    return await kinopoisk_get("search", "/movie/search", search_params(query, page, limit), decode=decode_search_page)
+
+# Источник страницы поиска в callback_data: «l1» — локальный каталог, «aN» — страница N из API
+LOCAL_SOURCE, API_SOURCE = "l", "a"
+
+# Страница результатов поиска: (источник, сериалы, всего страниц в источнике).
+# У локального каталога одна страница, и берется она, только если каталог заполнил ее целиком;
+# продолжение такой страницы — первая страница API. Иначе страница загружается из API.
+async def search_series_page(query: str, source: str = LOCAL_SOURCE, page: int = 1, limit: int = SEARCH_PAGE_SIZE):
+    local_results = ()
+    if source == LOCAL_SOURCE:
+        local_results, confident = await search_local_page(query, limit)
+        if confident:
+            return LOCAL_SOURCE, local_results, 1
+        page = 1
+
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json().get("docs", [])
-    except requests.exceptions.RequestException as e:
+        results, pages = await fetch_search_page(query, page, limit)
+        return API_SOURCE, results, pages
+    except HTTP_ERRORS as e:
         logger.error(f"Ошибка API: {e}")
-        return []
+        return LOCAL_SOURCE, local_results, 1
+
+# Поиск сериалов по названию (первая страница)
+async def search_series(query: str):
+    _, results, _ = await search_series_page(query)
+    return results
+
+# Номер следующей страницы API после показанной страницы или None, если она последняя.
+# Полная страница каталога продолжается первой страницей API.
+def next_api_page(source: str, page: int, results, pages: int):
+    if source == LOCAL_SOURCE:
+        return 1 if len(results) >= SEARCH_PAGE_SIZE else None
+    return page + 1 if page < pages else None
+
+# Фоновые загрузки следующих страниц (ссылки держатся до завершения задачи)
+prefetch_tasks = set()
+
+def prefetch_search_page(query: str, page: int) -> asyncio.Task:
+    task = asyncio.ensure_future(search_series_page(query, API_SOURCE, page))
+    prefetch_tasks.add(task)
+    task.add_done_callback(prefetch_tasks.discard)
+    return task
+
+# Все страницы результатов начиная с указанной: (источник, номер, сериалы, всего страниц в источнике).
+# Следующая страница запрашивается в фоне, пока показывается текущая, и попадает в кэш,
+# поэтому загрузка продолжается и после закрытия итератора.
+async def iter_search_pages(query: str, source: str = LOCAL_SOURCE, page: int = 1):
+    pending = asyncio.ensure_future(search_series_page(query, source, page))
+    if source == LOCAL_SOURCE:
+        page = 1
+    while pending is not None:
+        source, results, pages = await pending
+        if not results:
+            return
+        next_page = next_api_page(source, page, results, pages)
+        pending = prefetch_search_page(query, next_page) if next_page else None
+        yield source, page, results, pages
+        page = next_page
 
 # Получение топ-10 сериалов
-async def get_top_series():
-    url = "https://api.kinopoisk.dev/v1.4/movie"
-    headers = {"X-API-KEY": KINOPOISK_API_KEY}
+async def get_top_series(refresh: bool = False):
     params = {
         "page": 1,
         "limit": 10,
         "type": "tv-series",
         "sortField": "votes.kp",
-        "sortType": "-1"
+        "sortType": "-1",
+        "selectFields": SERIES_FIELDS
     }
 
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json().get("docs", [])
-    except requests.exceptions.RequestException as e:
+        return await kinopoisk_get("top", "/movie", params, refresh=refresh, decode=series_from_docs)
+    except HTTP_ERRORS as e:
         logger.error(f"Ошибка API: {e}")
-        return []
+        return ()
+
+# Интервал фонового обновления топа и файл снимка для переживания перезапуска
+TOP_SERIES_REFRESH_INTERVAL = int(os.getenv("TOP_SERIES_REFRESH_INTERVAL", 15 * 60))
+TOP_SERIES_SNAPSHOT_PATH = Path(os.getenv("TOP_SERIES_SNAPSHOT_PATH", "top_series.json"))
+
+# Предзагруженный топ-10. Кортеж заменяется целиком, поэтому обработчики всегда видят согласованный список.
+top_series_snapshot = ()
+top_series_updated_at = 0.0
+
+def load_top_series_snapshot() -> None:
+    global top_series_snapshot, top_series_updated_at
+    try:
+        data = json.loads(TOP_SERIES_SNAPSHOT_PATH.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logger.warning(f"Не удалось прочитать снимок топа {TOP_SERIES_SNAPSHOT_PATH}: {e}")
+        return
+    top_series_snapshot = tuple(Series.from_json(item) for item in data.get("series", []))
+    top_series_updated_at = data.get("updated_at", 0.0)
+    logger.info(f"Загружен снимок топа: {len(top_series_snapshot)} сериалов")
+
+# Запись во временный файл и атомарная замена: при сбое на диске остается предыдущий снимок
+def save_top_series_snapshot(series, updated_at: float) -> None:
+    tmp_path = TOP_SERIES_SNAPSHOT_PATH.with_name(TOP_SERIES_SNAPSHOT_PATH.name + ".tmp")
+    tmp_path.write_text(
+        json.dumps({"updated_at": updated_at, "series": list(series)}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    os.replace(tmp_path, TOP_SERIES_SNAPSHOT_PATH)
+
+# Фоновая задача: обновляет список топа и подробности по каждому сериалу
+async def refresh_top_series_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    global top_series_snapshot, top_series_updated_at
+    top_series = await get_top_series(refresh=True)
+    if not top_series:
+        logger.warning("Не удалось обновить топ сериалов, остается предыдущий снимок")
+        return
+
+    details = await asyncio.gather(
+        *(get_series_info(series.id, refresh=True) for series in top_series[:10])
+    )
+    snapshot = tuple(detail or series for series, detail in zip(top_series[:10], details))
+    updated_at = time.time()
+
+    top_series_snapshot, top_series_updated_at = snapshot, updated_at
+    try:
+        await asyncio.to_thread(save_top_series_snapshot, snapshot, updated_at)
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить снимок топа: {e}")
+    logger.info(f"Топ сериалов обновлен: {len(snapshot)} сериалов")
 
 # Форматирование информации о сериале
 async def format_series_info(series):
-    name = series.get('name', 'Название неизвестно')
-    rating = series.get('rating', {}).get('kp', 0)
-    genres = ", ".join([g['name'] for g in series.get('genres', [])[:3]])
-    poster_url = series.get('poster', {}).get('url', '')
-    web_url = f"https://www.kinopoisk.ru/film/{series.get('id', '')}/"
-    year = series.get('year', '')
+    name = series.name or 'Название неизвестно'
+    rating = series.rating
+    genres = ", ".join(series.genres)
+    poster_url = series.poster_url
+    web_url = f"https://www.kinopoisk.ru/film/{series.id}/"
+    year = series.year or ''
 
     # Актеры (первые 3)
-    actors = []
-    for person in series.get('persons', []):
-        if person.get('enProfession') == 'actor':
-            actors.append(person.get('name', ''))
-            if len(actors) >= 3:
-                break
-    actors_str = ", ".join(actors) if actors else "не указано"
+    actors_str = ", ".join(series.actors) if series.actors else "не указано"
 
     info_text = (
         f"<b>🎬 {name}</b>\n"
@@ -123,6 +341,264 @@ async def format_series_info(series):
 
     return info_text
 
+# Режим вывода нескольких сериалов:
+# list — одно HTML-сообщение со списком, media_group — альбом постеров с подписями, cards — сообщение на каждый сериал
+SERIES_RENDER_MODE = os.getenv("SERIES_RENDER_MODE", "list")
+MESSAGE_LIMIT = 4096
+CAPTION_LIMIT = 1024
+MEDIA_GROUP_LIMIT = 10
+
+# Краткая запись о сериале для общего сообщения или подписи к постеру
+def format_series_entry(index: int, series) -> str:
+    name = html.escape(series.name or 'Название неизвестно')
+    rating = series.rating
+    year = series.year or ''
+    genres = html.escape(", ".join(series.genres))
+    web_url = f"https://www.kinopoisk.ru/film/{series.id}/"
+
+    entry = f"{index}. <a href='{web_url}'><b>{name}</b></a> ({year}) ⭐ {rating:.1f}"
+    if genres:
+        entry += f"\n📌 {genres}"
+    if series.actors:
+        entry += f"\n🎭 {html.escape(', '.join(series.actors))}"
+    return entry
+
+# Разбиение записей на сообщения не длиннее лимита Telegram (запись не разрывается)
+def split_entries(header: str, entries: list, limit: int = MESSAGE_LIMIT) -> list:
+    chunks = []
+    current = header
+    for entry in entries:
+        candidate = f"{current}\n\n{entry}" if current else entry
+        if len(candidate) > limit and current:
+            chunks.append(current)
+            current = entry
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+# Кнопки «Подробнее» для каждого сериала из списка
+def get_details_keyboard(series_list, start: int = 1, navigation=None):
+    buttons = [
+        InlineKeyboardButton(f"ℹ️ {index}", callback_data=f"details:{series.id}")
+        for index, series in enumerate(series_list, start=start)
+        if series.id
+    ]
+    rows = [buttons[i:i + 5] for i in range(0, len(buttons), 5)]
+    if navigation:
+        rows.append(navigation)
+    if not rows:
+        return None
+    return InlineKeyboardMarkup(rows)
+
+# Отправка списка сериалов в выбранном режиме
+async def send_series_list(update: Update, series_list, header: str) -> None:
+    message = update.effective_message
+
+    if SERIES_RENDER_MODE == "cards":
+        # Карточки отправляются с низким приоритетом, чтобы не задерживать ответы другим пользователям
+        with bulk_sends():
+            for series in series_list:
+                series_info = await format_series_info(series)
+                await message.reply_text(
+                    series_info,
+                    parse_mode="HTML"
+                )
+        await message.reply_text(
+            "Выберите действие:",
+            reply_markup=get_main_keyboard()
+        )
+        return
+
+    keyboard = get_details_keyboard(series_list)
+    entries = [format_series_entry(index, series) for index, series in enumerate(series_list, start=1)]
+
+    if SERIES_RENDER_MODE == "media_group":
+        media = []
+        text_entries = []
+        for series, entry in zip(series_list, entries):
+            poster_url = series.poster_url
+            if poster_url and len(entry) <= CAPTION_LIMIT:
+                media.append(InputMediaPhoto(media=poster_url, caption=entry, parse_mode="HTML"))
+            else:
+                text_entries.append(entry)
+        for i in range(0, len(media), MEDIA_GROUP_LIMIT):
+            group = media[i:i + MEDIA_GROUP_LIMIT]
+            if len(group) == 1:
+                await message.reply_photo(group[0].media, caption=group[0].caption, parse_mode="HTML")
+            else:
+                await message.reply_media_group(group)
+        # Альбом не поддерживает кнопки, поэтому они идут отдельным сообщением
+        entries = text_entries
+
+    chunks = split_entries(f"<b>{header}</b>", entries)
+    for i, chunk in enumerate(chunks):
+        await message.reply_text(
+            chunk,
+            parse_mode="HTML",
+            reply_markup=keyboard if i == len(chunks) - 1 else None,
+            link_preview_options=LinkPreviewOptions(is_disabled=True),
+        )
+
+# Кнопка «Подробнее»: полная карточка сериала
+async def series_details_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    series_id = int(query.data.split(":", 1)[1])
+    series = await get_series_info(series_id)
+    if not series:
+        await query.answer("😕 Не удалось загрузить информацию о сериале", show_alert=True)
+        return
+
+    await query.answer()
+    await query.message.reply_text(await format_series_info(series), parse_mode="HTML")
+
+# Страница поиска: текст списка и клавиатура с кнопками «Подробнее» и перелистывания.
+# Запрос хранится в заголовке сообщения («...»), в callback_data — только источник и номер страницы.
+# after_local — перед первой страницей API была страница каталога, «Назад» возвращает к ней.
+def render_search_page(query: str, source: str, page: int, results, pages: int, after_local: bool = False):
+    start = (page - 1) * SEARCH_PAGE_SIZE + 1
+    header = f"<b>🔍 Результаты по запросу «{html.escape(query)}»</b>"
+    if source == API_SOURCE and pages > 1:
+        header += f" (стр. {page}/{pages})"
+    entries = [format_series_entry(index, series) for index, series in enumerate(results, start=start)]
+
+    navigation = []
+    if source == API_SOURCE and page > 1:
+        navigation.append(InlineKeyboardButton("◀️ Назад", callback_data=f"search:{API_SOURCE}{page - 1}"))
+    elif source == API_SOURCE and after_local:
+        navigation.append(InlineKeyboardButton("◀️ Назад", callback_data=f"search:{LOCAL_SOURCE}1"))
+    next_page = next_api_page(source, page, results, pages)
+    if next_page:
+        navigation.append(InlineKeyboardButton("Далее ▶️", callback_data=f"search:{API_SOURCE}{next_page}"))
+    # Страница не длиннее одного сообщения: оно редактируется при перелистывании
+    text = split_entries(header, entries)[0]
+    return text, get_details_keyboard(results, start=start, navigation=navigation)
+
+# Запрос из заголовка сообщения с результатами
+def query_from_message(text: str) -> str:
+    first_line = (text or "").split("\n", 1)[0]
+    start, end = first_line.find("«"), first_line.rfind("»")
+    return first_line[start + 1:end] if 0 <= start < end else ""
+
+# Источник и номер страницы из callback_data («search:a2»; в старых сообщениях — «search:2», страница API)
+def parse_search_cursor(data: str):
+    cursor = data.split(":", 1)[1]
+    if cursor[0] in (LOCAL_SOURCE, API_SOURCE):
+        return cursor[0], int(cursor[1:])
+    return API_SOURCE, int(cursor)
+
+# Кнопки «Назад»/«Далее»: то же сообщение редактируется, страницы берутся из кэша.
+# Каждая страница остается в своем источнике: за страницей каталога следуют страницы API по порядку.
+async def search_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    callback = update.callback_query
+    source, page = parse_search_cursor(callback.data)
+    query = query_from_message(callback.message.text)
+    if not query:
+        await callback.answer("Повторите поиск", show_alert=True)
+        return
+
+    pages_iterator = iter_search_pages(query, source, page)
+    try:
+        found = await anext(pages_iterator, None)
+    finally:
+        await pages_iterator.aclose()
+    if found is None:
+        await callback.answer("😕 Не удалось загрузить страницу", show_alert=True)
+        return
+
+    source, page, results, pages = found
+    after_local = False
+    if source == API_SOURCE and page == 1:
+        _, after_local = await search_local_page(query)
+    text, keyboard = render_search_page(query, source, page, results, pages, after_local)
+    await callback.answer()
+    try:
+        await callback.edit_message_text(
+            text,
+            parse_mode="HTML",
+            reply_markup=keyboard,
+            link_preview_options=LinkPreviewOptions(is_disabled=True),
+        )
+    except BadRequest as e:
+        # Повторное нажатие на ту же страницу: сообщение не изменилось
+        if "not modified" not in str(e):
+            raise
+
+# Inline-режим (@бот название) включается у @BotFather командой /setinline
+INLINE_RESULTS_LIMIT = int(os.getenv("INLINE_RESULTS_LIMIT", 10))
+# Пауза в наборе, после которой запрос уходит в API (секунды)
+INLINE_DEBOUNCE = float(os.getenv("INLINE_DEBOUNCE", 0.4))
+# Сколько Telegram хранит ответ на такой же запрос на своей стороне (секунды)
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", 300))
+
+# Результаты по мере набора: ответ для «break» служит основой для «breaking»
+inline_cache = PrefixResultCache(ttl=CACHE_TTL["search"])
+# Текущий inline-запрос пользователя: новый запрос отменяет предыдущий
+inline_tasks = {}
+
+async def inline_result(series) -> InlineQueryResultArticle:
+    title = series.name or 'Название неизвестно'
+    if series.year:
+        title += f" ({series.year})"
+    description = f"⭐ {series.rating:.1f}"
+    if series.genres:
+        description += f" · {', '.join(series.genres)}"
+    return InlineQueryResultArticle(
+        id=str(series.id),
+        title=title,
+        description=description,
+        input_message_content=InputTextMessageContent(await format_series_info(series), parse_mode="HTML"),
+        thumbnail_url=series.poster_url or None,
+    )
+
+# Поиск для inline-режима с сохранением в кэш по префиксу.
+# Полным считается только ответ API из одной неполной страницы: локальный каталог
+# знает не все сериалы, поэтому его результаты для более длинных запросов не фильтруются.
+async def inline_search(query: str):
+    local_results, confident = await search_local_page(query, INLINE_RESULTS_LIMIT)
+    if confident:
+        inline_cache.put(query, local_results, complete=False)
+        return local_results
+    try:
+        results, pages = await fetch_search_page(query, limit=INLINE_RESULTS_LIMIT)
+    except HTTP_ERRORS as e:
+        logger.error(f"Ошибка API: {e}")
+        return local_results
+    inline_cache.put(query, results, complete=pages <= 1 and len(results) < INLINE_RESULTS_LIMIT)
+    return results
+
+# Inline-запрос: ответ из кэша по префиксу, к API — только после паузы в наборе
+async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    inline_query = update.inline_query
+    query = normalize_query(inline_query.query)
+    user_id = inline_query.from_user.id
+
+    previous = inline_tasks.get(user_id)
+    if previous is not None and not previous.done():
+        previous.cancel()
+    task = asyncio.current_task()
+    inline_tasks[user_id] = task
+
+    try:
+        if not query:
+            # Пустой запрос: топ из памяти
+            results = top_series_snapshot[:INLINE_RESULTS_LIMIT]
+        else:
+            results = inline_cache.get(query)
+            if results is None:
+                await asyncio.sleep(INLINE_DEBOUNCE)
+                results = await inline_search(query)
+
+        articles = [await inline_result(series) for series in results if series.id]
+        await inline_query.answer(articles, cache_time=INLINE_CACHE_TIME)
+    except BadRequest as e:
+        # Запрос устарел, пока шел поиск
+        logger.info(f"Inline-запрос не отправлен: {e}")
+    finally:
+        if inline_tasks.get(user_id) is task:
+            del inline_tasks[user_id]
+
 # Команда /start
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
@@ -139,7 +615,9 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "ℹ️ *Помощь по боту*\n\n"
         "Этот бот помогает находить информацию о сериалах:\n"
         "- 🔍 Поиск сериалов по названию\n"
-        "- 🏆 Просмотр топ-10 сериалов\n\n"
+        "- 🏆 Просмотр топ-10 сериалов\n"
+        "- ⭐ Избранное: /fav ID, /unfav ID, /favorites\n"
+        "- ⌨️ Поиск в любом чате: @имя\\_бота название\n\n"
         "После поиска вы увидите:\n"
         "- Название и жанр\n"
         "- Рейтинг\n"
@@ -150,6 +628,73 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     )
     await update.message.reply_text(help_text, parse_mode="Markdown")
 
+# ID сериала из аргумента команды (число или ссылка на Кинопоиск)
+def parse_series_id(args) -> int:
+    if not args:
+        return 0
+    value = args[0].rstrip("/").rsplit("/", 1)[-1]
+    return int(value) if value.isdigit() else 0
+
+# Команда /fav ID: добавить сериал в избранное
+async def fav_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    series_id = parse_series_id(context.args)
+    if not series_id:
+        await update.message.reply_text("Укажите ID сериала: /fav 464963")
+        return
+
+    series = await get_series_info(series_id)
+    if not series:
+        await update.message.reply_text("😕 Сериал не найден.")
+        return
+
+    user = update.effective_user
+    name = series.name or str(series_id)
+    await favorites.add(user.id, series_id, name, (user.username, user.first_name, user.last_name))
+    await update.message.reply_text(f"⭐ «{name}» добавлен в избранное")
+
+# Команда /unfav ID: удалить сериал из избранного
+async def unfav_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    series_id = parse_series_id(context.args)
+    if not series_id:
+        await update.message.reply_text("Укажите ID сериала: /unfav 464963")
+        return
+
+    await favorites.remove(update.effective_user.id, series_id)
+    await update.message.reply_text("🗑 Сериал удален из избранного")
+
+# Команда /favorites: список избранного
+async def favorites_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    items = await favorites.list(update.effective_user.id)
+    if not items:
+        await update.message.reply_text("В избранном пока пусто. Добавьте сериал командой /fav ID")
+        return
+
+    lines = [
+        f"• <a href='https://www.kinopoisk.ru/film/{series_id}/'>{html.escape(name or str(series_id))}</a> — {series_id}"
+        for series_id, name in items
+    ]
+    await update.message.reply_text("⭐ Ваше избранное:\n" + "\n".join(lines), parse_mode="HTML")
+
+# Команда /stats: счетчики кэша и объединения запросов
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    cache_stats = kinopoisk_cache.stats()
+    flight_stats = kinopoisk_flight.stats()
+    loader_stats = series_loader.stats()
+    inline_stats = inline_cache.stats()
+    send_stats = outbound.stats()
+    await update.message.reply_text(
+        "📊 Статистика запросов к Кинопоиску\n"
+        f"Кэш: {cache_stats['entries']} записей, {cache_stats['bytes'] // 1024} КБ\n"
+        f"Попадания: {cache_stats['hits']}, устаревшие: {cache_stats['stale_hits']}, промахи: {cache_stats['misses']}\n"
+        f"Запросов к API: {flight_stats['executed']}, объединено: {flight_stats['deduplicated']}, "
+        f"в процессе: {flight_stats['in_flight']}\n"
+        f"Пакетных запросов сериалов: {loader_stats['batches']} (сериалов: {loader_stats['loaded']})\n"
+        f"Inline: попадания {inline_stats['hits']}, по префиксу {inline_stats['prefix_hits']}, "
+        f"промахи {inline_stats['misses']}\n"
+        f"Очередь отправки: {send_stats['queued']} (из них массовых: {send_stats['queued_bulk']}), "
+        f"повторов после 429: {send_stats['retried']}"
+    )
+
 # Обработчик текстовых сообщений
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     text = update.message.text
@@ -166,59 +711,104 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 # Показать топ сериалов
 async def show_top_series(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("🔄 Загружаю топ-10 сериалов...")
-
-    top_series = await get_top_series()
+    # Ответ из памяти; запрос к API только если фоновая задача еще не успела загрузить топ
+    top_series = top_series_snapshot
+    if not top_series:
+        await update.message.reply_text("🔄 Загружаю топ-10 сериалов...")
+        top_series = await get_top_series()
 
     if not top_series:
         await update.message.reply_text("😕 Не удалось загрузить топ сериалов. Попробуйте позже.")
         return
 
-    for series in top_series[:10]:
-        series_info = await format_series_info(series)
-        await update.message.reply_text(
-            series_info,
-            parse_mode="HTML"
-        )
-
-    await update.message.reply_text(
-        "Выберите действие:",
-        reply_markup=get_main_keyboard()
-    )
+    await send_series_list(update, top_series[:10], "🏆 Топ-10 сериалов")
 
 # Обработка поиска по названию
 async def process_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query = update.message.text
-    await update.message.reply_text(f"🔍 Ищу сериалы по запросу: {query}...")
+    query = " ".join(update.message.text.split())
+    if SERIES_RENDER_MODE == "cards":
+        await update.message.reply_text(f"🔍 Ищу сериалы по запросу: {query}...")
 
-    results = await search_series(query)
+    # Первая страница; вторая тем временем загружается в фоне
+    pages_iterator = iter_search_pages(query)
+    try:
+        found = await anext(pages_iterator, None)
+    finally:
+        await pages_iterator.aclose()
+    del context.user_data['awaiting_search']
 
-    if not results:
+    if found is None:
         await update.message.reply_text("😕 Ничего не найдено. Попробуйте другой запрос.")
-        del context.user_data['awaiting_search']
         return
 
-    for series in results[:3]:  # Показываем первые 3 результата
-        series_info = await format_series_info(series)
-        await update.message.reply_text(
-            series_info,
-            parse_mode="HTML"
-        )
+    source, page, results, pages = found
+    if SERIES_RENDER_MODE != "list":
+        await send_series_list(update, results, f"🔍 Результаты по запросу «{html.escape(query)}»")
+        return
 
-    del context.user_data['awaiting_search']
+    text, keyboard = render_search_page(query, source, page, results, pages)
     await update.message.reply_text(
-        "Выберите действие:",
-        reply_markup=get_main_keyboard()
+        text,
+        parse_mode="HTML",
+        reply_markup=keyboard,
+        link_preview_options=LinkPreviewOptions(is_disabled=True),
     )
 
-def main() -> None:
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+# Открытие каталога и избранного, загрузка снимка топа и запуск его периодического обновления
+async def post_init(application: Application) -> None:
+    global catalog, favorites
+    catalog = await asyncio.to_thread(SeriesCatalog, SERIES_DB_PATH)
+    favorites = await asyncio.to_thread(FavoritesStore, SERIES_DB_PATH)
+    load_top_series_snapshot()
+    if application.job_queue is None:
+        logger.warning("JobQueue недоступна (нужен python-telegram-bot[job-queue]), топ не будет обновляться в фоне")
+        return
+    age = time.time() - top_series_updated_at
+    application.job_queue.run_repeating(
+        refresh_top_series_job,
+        interval=TOP_SERIES_REFRESH_INTERVAL,
+        first=max(TOP_SERIES_REFRESH_INTERVAL - age, 1),
+        name="refresh_top_series",
+    )
+
+# Закрытие HTTP-клиента и баз данных при остановке
+async def post_shutdown(application: Application) -> None:
+    await close_session()
+    if favorites is not None:
+        await favorites.close()
+    if catalog is not None:
+        catalog.close()
+
+# Приложение со всеми обработчиками (для polling и webhook-сервера)
+def build_application() -> Application:
+    # concurrent_updates: медленный запрос одного пользователя не задерживает обработку остальных
+    application = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .concurrent_updates(True)
+        .rate_limiter(PTBRateLimiter(bot_key(TELEGRAM_TOKEN)))
+        # Флаг ожидания поиска и другие данные пользователей сохраняются между перезапусками
+        .persistence(SQLitePersistence(os.getenv("STATE_DB_PATH", "series_state.db")))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("fav", fav_command))
+    application.add_handler(CommandHandler("unfav", unfav_command))
+    application.add_handler(CommandHandler("favorites", favorites_command))
+    application.add_handler(CallbackQueryHandler(series_details_callback, pattern=r"^details:\d+$"))
+    application.add_handler(CallbackQueryHandler(search_page_callback, pattern=r"^search:[la]?\d+$"))
+    # block=False: ожидание паузы в наборе не задерживает другие обновления
+    application.add_handler(InlineQueryHandler(inline_query_handler, block=False))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    return application
 
-    application.run_polling()
+def main() -> None:
+    build_application().run_polling()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,178 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS genres (
+    genre_id INTEGER PRIMARY KEY,
+    genre_name TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS series (
+    series_id INTEGER PRIMARY KEY,
+    name TEXT,
+    alternative_name TEXT,
+    en_name TEXT,
+    type TEXT,
+    year INTEGER,
+    rating_kp REAL,
+    votes_kp INTEGER,
+    poster_url TEXT,
+    doc TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS series_names (
+    series_id INTEGER NOT NULL REFERENCES series (series_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    PRIMARY KEY (series_id, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS series_genres (
+    series_id INTEGER NOT NULL REFERENCES series (series_id) ON DELETE CASCADE,
+    genre_id INTEGER NOT NULL REFERENCES genres (genre_id),
+    PRIMARY KEY (series_id, genre_id)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS series_fts USING fts5(
+    names,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+# Все названия сериала из документа Кинопоиска (основное, альтернативное, английское и names[])
+def document_names(doc: dict) -> list:
+    names = [doc.get("name"), doc.get("alternativeName"), doc.get("enName")]
+    names.extend(item.get("name") for item in doc.get("names") or [] if isinstance(item, dict))
+    seen = []
+    for name in names:
+        if name and name not in seen:
+            seen.append(name)
+    return seen
+
+
+class SeriesCatalog:
+    """Локальный каталог сериалов в series_bot.db с полнотекстовым индексом FTS5.
+
+    Чтение выполняется на отдельном соединении и занимает доли миллисекунды;
+    и поиск, и запись (upsert_many) вызываются из пула потоков, а не в event loop.
+    """
+
+    def __init__(self, db_path: str = "series_bot.db"):
+        self.db_path = db_path
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        with self._writer:
+            self._writer.executescript(SCHEMA)
+        self._reader = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    # Добавление или обновление документов. Более полный документ (например, из /movie/{id})
+    # не перезаписывается сокращенным из результатов поиска.
+    def upsert_many(self, docs) -> int:
+        rows = [doc for doc in docs if isinstance(doc, dict) and doc.get("id")]
+        if not rows:
+            return 0
+        now = time.time()
+        with self._write_lock, self._writer:
+            for doc in rows:
+                self._upsert(doc, now)
+        return len(rows)
+
+    def _upsert(self, doc: dict, now: float) -> None:
+        series_id = doc["id"]
+        doc_json = json.dumps(doc, ensure_ascii=False)
+        rating = doc.get("rating") or {}
+        votes = doc.get("votes") or {}
+        poster = doc.get("poster") or {}
+        self._writer.execute(
+            """
+            INSERT INTO series (series_id, name, alternative_name, en_name, type, year,
+                                rating_kp, votes_kp, poster_url, doc, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (series_id) DO UPDATE SET
+                name = COALESCE(excluded.name, name),
+                alternative_name = COALESCE(excluded.alternative_name, alternative_name),
+                en_name = COALESCE(excluded.en_name, en_name),
+                type = COALESCE(excluded.type, type),
+                year = COALESCE(excluded.year, year),
+                rating_kp = COALESCE(excluded.rating_kp, rating_kp),
+                votes_kp = COALESCE(excluded.votes_kp, votes_kp),
+                poster_url = COALESCE(excluded.poster_url, poster_url),
+                doc = CASE WHEN length(excluded.doc) >= length(doc) THEN excluded.doc ELSE doc END,
+                updated_at = excluded.updated_at
+            """,
+            (
+                series_id, doc.get("name"), doc.get("alternativeName"), doc.get("enName"),
+                doc.get("type"), doc.get("year"), rating.get("kp"), votes.get("kp"),
+                poster.get("url"), doc_json, now,
+            ),
+        )
+
+        names = document_names(doc)
+        if names:
+            self._writer.executemany(
+                "INSERT OR IGNORE INTO series_names (series_id, name) VALUES (?, ?)",
+                [(series_id, name) for name in names],
+            )
+            all_names = [row[0] for row in self._writer.execute(
+                "SELECT name FROM series_names WHERE series_id = ?", (series_id,)
+            )]
+            self._writer.execute("DELETE FROM series_fts WHERE rowid = ?", (series_id,))
+            self._writer.execute(
+                "INSERT INTO series_fts (rowid, names) VALUES (?, ?)",
+                (series_id, "\n".join(all_names)),
+            )
+
+        for genre in doc.get("genres") or []:
+            genre_name = genre.get("name") if isinstance(genre, dict) else None
+            if not genre_name:
+                continue
+            self._writer.execute("INSERT OR IGNORE INTO genres (genre_name) VALUES (?)", (genre_name,))
+            self._writer.execute(
+                """
+                INSERT OR IGNORE INTO series_genres (series_id, genre_id)
+                SELECT ?, genre_id FROM genres WHERE genre_name = ?
+                """,
+                (series_id, genre_name),
+            )
+
+    # Поиск по индексу названий. Возвращает (документы, уверенность).
+    # Результат считается уверенным, только если найдено не меньше limit сериалов:
+    # одно точное совпадение не исключает новых или связанных сериалов, известных только API.
+    def search(self, query: str, limit: int = 5, series_type: str = "tv-series"):
+        tokens = _TOKEN_RE.findall(query.casefold())
+        if not tokens:
+            return [], False
+        # Каждое слово — префиксный поиск, кавычки экранируют синтаксис FTS5
+        match = " ".join(f'"{token}"*' for token in tokens)
+        rows = self._reader.execute(
+            """
+            SELECT s.series_id, s.doc
+            FROM series_fts
+            JOIN series AS s ON s.series_id = series_fts.rowid
+            WHERE series_fts MATCH ? AND COALESCE(s.type, ?) = ?
+            ORDER BY bm25(series_fts), s.votes_kp DESC
+            LIMIT ?
+            """,
+            (match, series_type, series_type, limit),
+        ).fetchall()
+        if not rows:
+            return [], False
+
+        docs = [json.loads(doc) for _, doc in rows]
+        return docs, len(docs) >= limit
+
+    def close(self) -> None:
+        self._reader.close()
+        self._writer.close()
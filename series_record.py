@@ -0,0 +1,63 @@
+from typing import NamedTuple
+
+# Поля документа Кинопоиска, которые запрашиваются через selectFields.
+# Кроме полей для вывода нужны названия, тип и голоса для локального каталога.
+SERIES_FIELDS = (
+    "id", "name", "alternativeName", "enName", "names", "type",
+    "year", "rating", "votes", "genres", "poster", "persons",
+)
+
+ACTORS_LIMIT = 3
+GENRES_LIMIT = 3
+
+
+class Series(NamedTuple):
+    """Компактная запись о сериале: только то, что выводит бот, актеры уже выбраны.
+
+    Альтернативное и английское названия нужны для поиска по ним (inline-режим).
+    """
+
+    id: int
+    name: str
+    year: int
+    rating: float
+    genres: tuple
+    poster_url: str
+    actors: tuple
+    alternative_name: str = ""
+    en_name: str = ""
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "Series":
+        actors = []
+        for person in doc.get("persons") or []:
+            if person.get("enProfession") == "actor" and person.get("name"):
+                actors.append(person["name"])
+                if len(actors) >= ACTORS_LIMIT:
+                    break
+        genres = [g.get("name") for g in doc.get("genres") or [] if isinstance(g, dict) and g.get("name")]
+        return cls(
+            id=doc.get("id") or 0,
+            name=doc.get("name") or doc.get("alternativeName") or doc.get("enName") or "",
+            year=doc.get("year") or 0,
+            rating=float((doc.get("rating") or {}).get("kp") or 0),
+            genres=tuple(genres[:GENRES_LIMIT]),
+            poster_url=(doc.get("poster") or {}).get("url") or "",
+            actors=tuple(actors),
+            alternative_name=doc.get("alternativeName") or "",
+            en_name=doc.get("enName") or "",
+        )
+
+    # Запись из JSON: список полей (снимок топа) или исходный документ API (старый формат снимка).
+    # В снимках до появления альтернативных названий полей семь.
+    @classmethod
+    def from_json(cls, value) -> "Series":
+        if isinstance(value, dict):
+            return cls.from_doc(value)
+        series_id, name, year, rating, genres, poster_url, actors, *names = value
+        return cls(series_id, name, year, rating, tuple(genres), poster_url, tuple(actors), *names)
+
+
+# Ответ со списком документов -> кортеж записей
+def series_from_docs(data) -> tuple:
+    return tuple(Series.from_doc(doc) for doc in (data or {}).get("docs", []))
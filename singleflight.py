@@ -0,0 +1,106 @@
+import asyncio
+import threading
+
+
+# Ключ запроса: эндпоинт + параметры, приведенные к строкам и отсортированные
+def make_key(endpoint: str, params: dict = None) -> tuple:
+    return (endpoint, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())))
+
+
+class SingleFlight:
+    """Объединение одинаковых одновременных запросов для asyncio.
+
+    Первый вызов с данным ключом выполняет запрос, остальные ждут
+    тот же future и получают тот же результат (или то же исключение).
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.executed = 0
+        self.deduplicated = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key, fetch):
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.deduplicated += 1
+        else:
+            self.executed += 1
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: отмена одного из ожидающих не отменяет общий запрос
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "deduplicated": self.deduplicated,
+            "in_flight": self.in_flight,
+        }
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ThreadSingleFlight:
+    """Тот же механизм для синхронного кода (потоки и блокирующий requests)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.calls = 0
+        self.executed = 0
+        self.deduplicated = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def do(self, key, fn):
+        with self._lock:
+            self.calls += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                self.executed += 1
+                call = self._inflight[key] = _Call()
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "deduplicated": self.deduplicated,
+            "in_flight": self.in_flight,
+        }
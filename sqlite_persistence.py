@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+# Данные пользователей, чатов и бота хранятся построчно, а не одним файлом:
+# запись изменившегося пользователя — одна строка, а не перезапись всего хранилища
+PERSISTENCE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ptb_data (
+    kind TEXT NOT NULL,
+    key INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ptb_conversations (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (name, key)
+) WITHOUT ROWID;
+"""
+
+USER, CHAT, BOT, CALLBACK = "user", "chat", "bot", "callback"
+
+
+def _digest(value: bytes) -> bytes:
+    return hashlib.blake2b(value, digest_size=16).digest()
+
+
+class SQLitePersistence(BasePersistence):
+    """Хранилище состояния PTB в SQLite с отложенной пакетной записью.
+
+    Данные пользователя и чата читаются лениво при первом обновлении от него
+    (refresh_user_data / refresh_chat_data), а не все при запуске.
+    Изменения копятся в памяти и записываются одной транзакцией в пуле потоков
+    через batch_delay секунд; flush при остановке дописывает остаток.
+    Состояния ConversationHandler загружаются при запуске: их мало, и они нужны сразу.
+    """
+
+    def __init__(self, db_path: str = "bot_state.db", store_data: PersistenceInput = None,
+                 update_interval: float = 5, batch_delay: float = 0.5):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.db_path = db_path
+        self.batch_delay = batch_delay
+        self._writer = self._connect()
+        with self._writer:
+            self._writer.executescript(PERSISTENCE_SCHEMA)
+        self._reader = self._connect()
+        self._write_lock = threading.Lock()
+        # Ключи, уже загруженные в память (или заведомо отсутствующие в базе)
+        self._loaded = {USER: set(), CHAT: set()}
+        # Незаписанные изменения: (kind, key) -> сериализованные данные или None для удаления
+        self._pending = {}
+        self._pending_conversations = {}
+        # Хэш последних записанных (или ожидающих записи) данных: (kind, key) -> digest или None для удаления.
+        # PTB передает bot_data и данные пользователей на каждом шаге update_interval, даже без изменений.
+        self._digests = {}
+        self._flush_task = None
+        self.batches = 0
+        self.writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _read(self, kind: str, key: int):
+        pending = self._pending.get((kind, key), ...)
+        if pending is not ...:
+            return None if pending is None else pickle.loads(pending)
+        row = self._reader.execute("SELECT data FROM ptb_data WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        self._digests[(kind, key)] = _digest(row[0]) if row else None
+        return pickle.loads(row[0]) if row else None
+
+    def _schedule(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.batch_delay)
+        await self._write_pending()
+
+    # Запись откладывается, только если данные отличаются от последних записанных
+    def _put(self, kind: str, key: int, data) -> None:
+        value = None if data is None else pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        digest = None if value is None else _digest(value)
+        if (kind, key) in self._digests and self._digests[(kind, key)] == digest:
+            return
+        self._digests[(kind, key)] = digest
+        self._pending[(kind, key)] = value
+        self._schedule()
+
+    async def _write_pending(self) -> None:
+        data, self._pending = self._pending, {}
+        conversations, self._pending_conversations = self._pending_conversations, {}
+        if not data and not conversations:
+            return
+        try:
+            await asyncio.to_thread(self._write_batch, data, conversations)
+        except Exception as e:
+            logger.error(f"Ошибка записи состояния бота: {e}")
+            # Непереданные изменения возвращаются в очередь, если их не перекрыли более новые.
+            # Хэши сбрасываются, чтобы следующее обновление тех же данных снова запланировало запись.
+            for key, value in data.items():
+                self._pending.setdefault(key, value)
+                self._digests.pop(key, None)
+            for key, value in conversations.items():
+                self._pending_conversations.setdefault(key, value)
+
+    def _write_batch(self, data: dict, conversations: dict) -> None:
+        now = time.time()
+        with self._write_lock, self._writer:
+            self._writer.executemany(
+                """
+                INSERT INTO ptb_data (kind, key, data, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (kind, key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+                """,
+                [(kind, key, value, now) for (kind, key), value in data.items() if value is not None],
+            )
+            self._writer.executemany(
+                "DELETE FROM ptb_data WHERE kind = ? AND key = ?",
+                [(kind, key) for (kind, key), value in data.items() if value is None],
+            )
+            self._writer.executemany(
+                """
+                INSERT INTO ptb_conversations (name, key, state, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (name, key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at
+                """,
+                [(name, key, state, now) for (name, key), state in conversations.items() if state is not None],
+            )
+            self._writer.executemany(
+                "DELETE FROM ptb_conversations WHERE name = ? AND key = ?",
+                [(name, key) for (name, key), state in conversations.items() if state is None],
+            )
+        self.batches += 1
+        self.writes += len(data) + len(conversations)
+
+    # Ленивая загрузка: при запуске данные пользователей и чатов не читаются
+    async def get_user_data(self) -> dict:
+        return {}
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self):
+        return self._read(BOT, 0) or {}
+
+    async def get_callback_data(self):
+        return self._read(CALLBACK, 0)
+
+    async def get_conversations(self, name: str) -> dict:
+        rows = self._reader.execute("SELECT key, state FROM ptb_conversations WHERE name = ?", (name,)).fetchall()
+        conversations = {tuple(json.loads(key)): json.loads(state) for key, state in rows}
+        for (pending_name, key), state in self._pending_conversations.items():
+            if pending_name == name:
+                if state is None:
+                    conversations.pop(tuple(json.loads(key)), None)
+                else:
+                    conversations[tuple(json.loads(key))] = json.loads(state)
+        return conversations
+
+    async def update_conversation(self, name: str, key, new_state) -> None:
+        self._pending_conversations[(name, json.dumps(list(key)))] = (
+            None if new_state is None else json.dumps(new_state)
+        )
+        self._schedule()
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._loaded[USER].add(user_id)
+        self._put(USER, user_id, data)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._loaded[CHAT].add(chat_id)
+        self._put(CHAT, chat_id, data)
+
+    async def update_bot_data(self, data) -> None:
+        self._put(BOT, 0, data)
+
+    async def update_callback_data(self, data) -> None:
+        self._put(CALLBACK, 0, data)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._loaded[USER].add(user_id)
+        self._put(USER, user_id, None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._loaded[CHAT].add(chat_id)
+        self._put(CHAT, chat_id, None)
+
+    # Вызывается перед обработкой каждого обновления: чтение из базы только в первый раз
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        if user_id in self._loaded[USER]:
+            return
+        self._loaded[USER].add(user_id)
+        stored = self._read(USER, user_id)
+        if stored:
+            for key, value in stored.items():
+                user_data.setdefault(key, value)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        if chat_id in self._loaded[CHAT]:
+            return
+        self._loaded[CHAT].add(chat_id)
+        stored = self._read(CHAT, chat_id)
+        if stored:
+            for key, value in stored.items():
+                chat_data.setdefault(key, value)
+
+    async def refresh_bot_data(self, bot_data) -> None:
+        pass
+
+    # Вызывается PTB при остановке приложения
+    async def flush(self) -> None:
+        # Запланированная запись дожидается своей задержки: запись в потоке нельзя прервать
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self._write_pending()
+        self._reader.close()
+        self._writer.close()
@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from apod_archive import BACKFILL_CHUNK_DAYS, ApodArchive, latest_apod_date
+
+
+def test_latest_date_is_utc_yesterday():
+    assert latest_apod_date() == datetime.now(timezone.utc).date() - timedelta(days=1)
+
+
+def test_backfill_ranges_end_at_latest_date_and_cover_the_period(tmp_path, monkeypatch):
+    archive = ApodArchive("DEMO_KEY", str(tmp_path / "apod.db"))
+    ranges = []
+
+    async def fetch_range(start, end):
+        ranges.append((start, end))
+        return 0
+
+    monkeypatch.setattr(archive, "fetch_range", fetch_range)
+    asyncio.run(archive.backfill(years=1, pause=0))
+
+    latest = latest_apod_date()
+    assert ranges[0][1] == latest
+    assert all((end - start).days < BACKFILL_CHUNK_DAYS for start, end in ranges)
+    for (_, older_end), (newer_start, _) in zip(ranges[1:], ranges):
+        assert older_end == newer_start - timedelta(days=1)
+    assert ranges[-1][0] == latest - timedelta(days=365)
+    archive.close()
+
+
+def test_only_images_are_served_and_file_ids_persist(tmp_path):
+    path = str(tmp_path / "apod.db")
+    archive = ApodArchive("DEMO_KEY", path)
+    archive._store([
+        {"date": "2024-01-01", "title": "Галактика", "url": "https://apod/1.jpg", "media_type": "image"},
+        {"date": "2024-01-02", "title": "Видео", "url": "https://youtube/2", "media_type": "video"},
+    ])
+    assert len(archive) == 1
+    assert archive.random_entry()["date"] == "2024-01-01"
+    asyncio.run(archive.set_file_id("2024-01-01", "file-1"))
+    archive.close()
+
+    reopened = ApodArchive("DEMO_KEY", path)
+    assert reopened.random_entry()["file_id"] == "file-1"
+    reopened.close()
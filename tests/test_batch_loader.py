@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from batch_loader import BatchLoader
+
+
+class FakeSource:
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    async def load_many(self, keys: list) -> dict:
+        self.batches.append(sorted(keys))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise ConnectionError("API недоступен")
+        return {key: f"series-{key}" for key in keys if key != 404}
+
+
+def test_concurrent_loads_share_one_batch():
+    source = FakeSource()
+
+    async def scenario():
+        loader = BatchLoader(source.load_many, window=0.01)
+        return await asyncio.gather(loader.load(1), loader.load(2), loader.load(1), loader.load(404))
+
+    assert asyncio.run(scenario()) == ["series-1", "series-2", "series-1", None]
+    assert source.batches == [[1, 2, 404]]
+
+
+def test_max_batch_flushes_early():
+    source = FakeSource()
+
+    async def scenario():
+        loader = BatchLoader(source.load_many, window=10, max_batch=2)
+        return await asyncio.wait_for(asyncio.gather(*(loader.load(key) for key in range(4))), timeout=1)
+
+    assert asyncio.run(scenario()) == [f"series-{key}" for key in range(4)]
+    assert source.batches == [[0, 1], [2, 3]]
+
+
+def test_error_reaches_every_waiter_and_key_can_be_retried():
+    source = FakeSource(fail=True)
+
+    async def scenario():
+        loader = BatchLoader(source.load_many, window=0.01)
+        results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in results)
+        source.fail = False
+        return await loader.load(1)
+
+    assert asyncio.run(scenario()) == "series-1"
+    assert source.batches == [[1, 2], [1]]
+
+
+def test_cancelled_waiter_does_not_cancel_others():
+    source = FakeSource()
+
+    async def scenario():
+        loader = BatchLoader(source.load_many, window=0.01)
+        first = asyncio.ensure_future(loader.load(1))
+        second = asyncio.ensure_future(loader.load(1))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "series-1"
@@ -0,0 +1,36 @@
+from breed_index import BreedIndex
+
+BREEDS = [
+    {"id": "abys", "name": "Abyssinian", "alt_names": ""},
+    {"id": "abob", "name": "American Bobtail", "alt_names": ""},
+    {"id": "acur", "name": "American Curl", "alt_names": ""},
+    {"id": "siam", "name": "Siamese", "alt_names": "Meezer"},
+    {"id": "sphy", "name": "Sphynx", "alt_names": "Canadian Hairless"},
+]
+
+
+def names(result):
+    return result["name"] if result else None
+
+
+def test_exact_alt_name_id_and_typo():
+    index = BreedIndex(BREEDS)
+    assert names(index.lookup("Siamese")) == "Siamese"
+    assert names(index.lookup("meezer")) == "Siamese"
+    assert names(index.lookup("SPHY")) == "Sphynx"
+    assert names(index.lookup("abysinian")) == "Abyssinian"
+
+
+def test_unique_prefix_finds_breed():
+    index = BreedIndex(BREEDS)
+    assert names(index.lookup("siam")) == "Siamese"
+    assert names(index.lookup("american b")) == "American Bobtail"
+
+
+def test_ambiguous_prefix_finds_nothing_and_suggests_breeds():
+    index = BreedIndex(BREEDS)
+    for query in ("a", "s", "american"):
+        assert index.lookup(query) is None
+    assert index.suggestions("american") == ["American Bobtail", "American Curl"]
+    assert index.suggestions("s") == ["Siamese", "Sphynx"]
+    assert index.suggestions("xyz") == []
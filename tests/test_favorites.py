@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import sqlite3
+
+from favorites import FavoritesStore
+
+
+def create_legacy_table(path) -> None:
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE user_favorites (user_id INTEGER, series_id INTEGER, series_name TEXT)")
+        conn.executemany(
+            "INSERT INTO user_favorites VALUES (?, ?, ?)",
+            [(1, 10, "Шерлок"), (1, 10, "Шерлок"), (1, 20, "Доктор Кто"), (None, 30, "Без пользователя"),
+             (2, None, "Без сериала"), (2, 10, "Шерлок")],
+        )
+    conn.close()
+
+
+def test_migration_drops_duplicates_and_logs_dropped_rows(tmp_path, caplog):
+    path = str(tmp_path / "favorites.db")
+    create_legacy_table(path)
+
+    with caplog.at_level(logging.INFO, logger="favorites"):
+        store = FavoritesStore(path)
+
+    rows = store._reader.execute(
+        "SELECT user_id, series_id FROM user_favorites ORDER BY user_id, series_id"
+    ).fetchall()
+    assert rows == [(1, 10), (1, 20), (2, 10)]
+    assert "перенесено 3 из 6 строк" in caplog.text
+    assert "удалено без user_id или series_id: 2, дублей: 1" in caplog.text
+    asyncio.run(store.close())
+
+
+def test_migration_is_idempotent(tmp_path):
+    path = str(tmp_path / "favorites.db")
+    create_legacy_table(path)
+    asyncio.run(FavoritesStore(path).close())
+
+    store = FavoritesStore(path)
+    count = store._reader.execute("SELECT COUNT(*) FROM user_favorites").fetchone()[0]
+    assert count == 3
+    asyncio.run(store.close())
+
+
+def test_batched_add_list_remove(tmp_path):
+    async def scenario():
+        store = FavoritesStore(str(tmp_path / "favorites.db"))
+        await asyncio.gather(*(store.add(1, series_id, f"Сериал {series_id}") for series_id in range(5)))
+        await store.add(2, 3, "Сериал 3", ("user", "Имя", None))
+        assert store.batches < 6
+
+        listed = await store.list(1)
+        assert sorted(series_id for series_id, _ in listed) == [0, 1, 2, 3, 4]
+
+        await store.remove(1, 3)
+        assert not store.contains(1, 3)
+        assert store.contains(2, 3)
+        await store.close()
+
+    asyncio.run(scenario())
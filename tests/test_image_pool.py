@@ -0,0 +1,47 @@
+import asyncio
+
+from image_pool import ImagePool
+
+
+class FakeApi:
+    def __init__(self):
+        self.calls = []
+
+    async def fetch_batch(self, breed_id: str, limit: int) -> list:
+        start = len(self.calls) * limit
+        self.calls.append(breed_id)
+        return [f"{breed_id}-{i}" for i in range(start, start + limit)]
+
+
+def test_warm_skips_breeds_with_enough_images():
+    api = FakeApi()
+
+    async def scenario():
+        pool = ImagePool(api.fetch_batch, size=5, low_watermark=2)
+        await pool.warm(["abys", "beng"])
+        await pool.warm(["abys", "beng"])
+        assert api.calls == ["abys", "beng"]
+
+        # После трех ответов в буфере abys остается 2 ссылки — еще не ниже порога
+        for _ in range(3):
+            await pool.get("abys")
+        await asyncio.sleep(0)
+        await pool.warm(["abys"])
+        assert api.calls == ["abys", "beng"]
+
+    asyncio.run(scenario())
+
+
+def test_get_refills_below_low_watermark():
+    api = FakeApi()
+
+    async def scenario():
+        pool = ImagePool(api.fetch_batch, size=3, low_watermark=2)
+        first = await pool.get("abys")
+        second = await pool.get("abys")
+        await asyncio.sleep(0)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert (first, second) == ("abys-0", "abys-1")
+    assert api.calls == ["abys", "abys"]
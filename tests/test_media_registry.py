@@ -0,0 +1,102 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiogram")
+from aiogram.exceptions import TelegramBadRequest  # noqa: E402
+from aiogram.methods import SendMessage  # noqa: E402
+from aiogram.types import FSInputFile  # noqa: E402
+
+from media_registry import MediaRegistry  # noqa: E402
+
+
+class FakeSender:
+    """Отправка, которая выдает новый file_id на каждую загрузку и может отклонить file_id."""
+
+    def __init__(self):
+        self.uploads = 0
+        self.sent_ids = []
+        self.rejected = set()
+
+    async def __call__(self, media):
+        if isinstance(media, FSInputFile):
+            self.uploads += 1
+            return SimpleNamespace(file_id=f"file-{self.uploads}")
+        if media in self.rejected:
+            raise TelegramBadRequest(SendMessage(chat_id=1, text="x"), "wrong file identifier")
+        self.sent_ids.append(media)
+        return SimpleNamespace(file_id=media)
+
+
+def send(registry, sender, path, bot_id=1):
+    return asyncio.run(registry.send(bot_id, "voice", path, sender, lambda m: m.file_id))
+
+
+def test_second_send_reuses_file_id(tmp_path):
+    path = tmp_path / "voice.ogg"
+    path.write_bytes(b"voice")
+    registry = MediaRegistry(str(tmp_path / "media.db"))
+    sender = FakeSender()
+
+    send(registry, sender, path)
+    send(registry, sender, path)
+    assert sender.uploads == 1
+    assert sender.sent_ids == ["file-1"]
+    assert (registry.uploads, registry.hits) == (1, 1)
+    registry.close()
+
+
+def test_file_ids_are_per_bot(tmp_path):
+    path = tmp_path / "voice.ogg"
+    path.write_bytes(b"voice")
+    registry = MediaRegistry(str(tmp_path / "media.db"))
+    sender = FakeSender()
+
+    send(registry, sender, path, bot_id=1)
+    send(registry, sender, path, bot_id=2)
+    assert sender.uploads == 2
+    registry.close()
+
+
+def test_changed_file_is_uploaded_again(tmp_path):
+    path = tmp_path / "voice.ogg"
+    path.write_bytes(b"voice")
+    registry = MediaRegistry(str(tmp_path / "media.db"))
+    sender = FakeSender()
+
+    send(registry, sender, path)
+    path.write_bytes(b"another voice")
+    send(registry, sender, path)
+    assert sender.uploads == 2
+    registry.close()
+
+
+def test_same_content_under_another_path_reuses_file_id(tmp_path):
+    first = tmp_path / "voice.ogg"
+    second = tmp_path / "copy.ogg"
+    first.write_bytes(b"voice")
+    second.write_bytes(b"voice")
+    registry = MediaRegistry(str(tmp_path / "media.db"))
+    sender = FakeSender()
+
+    send(registry, sender, first)
+    send(registry, sender, second)
+    assert sender.uploads == 1
+    assert sender.sent_ids == ["file-1"]
+    registry.close()
+
+
+def test_rejected_file_id_falls_back_to_upload(tmp_path):
+    path = tmp_path / "voice.ogg"
+    path.write_bytes(b"voice")
+    registry = MediaRegistry(str(tmp_path / "media.db"))
+    sender = FakeSender()
+
+    send(registry, sender, path)
+    sender.rejected.add("file-1")
+    send(registry, sender, path)
+    send(registry, sender, path)
+    assert sender.uploads == 2
+    assert sender.sent_ids == ["file-2"]
+    registry.close()
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import sqlite3
+
+from photo_store import PhotoStore
+
+
+def add_blob(store, tmp_path, content: bytes, file_unique_id: str):
+    tmp_file = tmp_path / f"{file_unique_id}.part"
+    tmp_file.write_bytes(content)
+    sha256 = hashlib.sha256(content).hexdigest()
+    path, is_new = store._commit_blob(tmp_file, sha256, len(content), file_unique_id)
+    return sha256, path, is_new
+
+
+def test_manifest_paths_are_relative_to_root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = PhotoStore("img")
+    sha256, path, is_new = add_blob(store, tmp_path, b"photo", "u1")
+    assert is_new and path.exists()
+    stored = store._conn.execute("SELECT path FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()[0]
+    assert stored == f"{sha256[:2]}/{sha256[2:4]}/{sha256}.jpg"
+    store.close()
+
+    # Тот же каталог хранилища, открытый из другого рабочего каталога
+    other = tmp_path / "other"
+    other.mkdir()
+    monkeypatch.chdir(other)
+    store = PhotoStore(tmp_path / "img")
+    found_sha256, found_path = store._find_by_unique_id("u1")
+    assert found_sha256 == sha256
+    assert found_path.read_bytes() == b"photo"
+    store.close()
+
+
+def test_duplicate_content_is_stored_once(tmp_path):
+    store = PhotoStore(tmp_path / "img")
+    _, first, first_new = add_blob(store, tmp_path, b"photo", "u1")
+    _, second, second_new = add_blob(store, tmp_path, b"photo", "u2")
+    assert first_new and not second_new
+    assert first == second
+    assert store.usage_bytes == len(b"photo")
+    store.close()
+
+
+def test_new_blobs_update_usage_without_scanning_manifest(tmp_path, monkeypatch):
+    store = PhotoStore(tmp_path / "img")
+
+    def full_scan():
+        raise AssertionError("SUM(size) на каждое новое фото")
+
+    monkeypatch.setattr(store, "_usage", full_scan)
+    add_blob(store, tmp_path, b"a" * 10, "u1")
+    add_blob(store, tmp_path, b"b" * 25, "u2")
+    add_blob(store, tmp_path, b"a" * 10, "u3")
+    assert store.usage_bytes == 35
+    monkeypatch.undo()
+    assert store._usage() == 35
+    store.close()
+
+
+def test_legacy_cwd_relative_paths_are_migrated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = PhotoStore("img")
+    sha256, path, _ = add_blob(store, tmp_path, b"photo", "u1")
+    with store._conn:
+        store._conn.execute("UPDATE blobs SET path = ?", (os.path.join("img", sha256[:2], sha256[2:4], f"{sha256}.jpg"),))
+    store.close()
+
+    store = PhotoStore("img")
+    assert store._find_by_unique_id("u1") == (sha256, path)
+    store.close()
+    conn = sqlite3.connect(tmp_path / "img" / "manifest.db")
+    assert conn.execute("SELECT path FROM blobs").fetchone()[0] == f"{sha256[:2]}/{sha256[2:4]}/{sha256}.jpg"
+    conn.close()
+
+
+def test_eviction_stops_when_files_cannot_be_removed(tmp_path, monkeypatch):
+    store = PhotoStore(tmp_path / "img", max_bytes=100, eviction="oldest")
+    stuck = {add_blob(store, tmp_path, bytes([i]) * 40, f"u{i}")[0] for i in range(3)}
+
+    def remove(path):
+        raise PermissionError(13, "Permission denied", str(path))
+
+    monkeypatch.setattr("photo_store.os.remove", remove)
+    assert store.evict() == 0
+    assert store.usage_bytes == 120
+    assert store.stats()["blobs"] == len(stuck)
+    store.close()
+
+
+def test_eviction_skips_stuck_files_and_removes_others(tmp_path, monkeypatch):
+    store = PhotoStore(tmp_path / "img", max_bytes=100, eviction="oldest")
+    stuck_sha256, stuck_path, _ = add_blob(store, tmp_path, b"a" * 40, "u1")
+    add_blob(store, tmp_path, b"b" * 40, "u2")
+    add_blob(store, tmp_path, b"c" * 40, "u3")
+    real_remove = os.remove
+
+    def remove(path):
+        if os.fspath(path) == os.fspath(stuck_path):
+            raise PermissionError(13, "Permission denied", str(path))
+        real_remove(path)
+
+    monkeypatch.setattr("photo_store.os.remove", remove)
+    evicted = []
+    store.on_evict.append(evicted.append)
+    assert store.evict() == 1
+    assert store.usage_bytes == 80
+    assert stuck_path.exists()
+    assert stuck_sha256 not in evicted
+    store.close()
+
+
+def test_eviction_sees_files_added_by_another_instance(tmp_path):
+    writer = PhotoStore(tmp_path / "img")
+    evictor = PhotoStore(tmp_path / "img", max_bytes=100, eviction="oldest")
+    for i in range(5):
+        add_blob(writer, tmp_path, bytes([i]) * 40, f"u{i}")
+
+    assert evictor.usage_bytes == 0
+    assert evictor.evict() == 3
+    assert evictor.usage_bytes == 80
+    writer.close()
+    evictor.close()
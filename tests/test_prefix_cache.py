@@ -0,0 +1,43 @@
+from prefix_cache import PrefixResultCache, name_matches
+from series_record import Series
+
+
+def series(series_id, name, alternative_name="", en_name=""):
+    return Series(id=series_id, name=name, year=2000, rating=0.0, genres=(), poster_url="", actors=(),
+                  alternative_name=alternative_name, en_name=en_name)
+
+
+BREAKING_BAD = series(1, "Во все тяжкие", alternative_name="Breaking Bad")
+BREAK = series(2, "Break Point")
+PRISON_BREAK = series(3, "Побег", en_name="Prison Break")
+
+
+def test_name_matches_word_prefixes():
+    assert name_matches("Breaking Bad", ["break", "ba"])
+    assert not name_matches("Breaking Bad", ["bad", "king"])
+
+
+def test_longer_query_matches_alternative_and_english_names():
+    cache = PrefixResultCache()
+    cache.put("break", (BREAKING_BAD, BREAK, PRISON_BREAK), complete=True)
+
+    assert cache.get("breaking") == (BREAKING_BAD,)
+    assert cache.get("break p") == (BREAK, PRISON_BREAK)
+    assert cache.stats()["prefix_hits"] == 2
+
+
+def test_incomplete_results_are_not_filtered():
+    cache = PrefixResultCache()
+    cache.put("break", (BREAKING_BAD, BREAK), complete=False)
+
+    assert cache.get("break") == (BREAKING_BAD, BREAK)
+    assert cache.get("breaking") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_entries_are_ignored():
+    cache = PrefixResultCache(ttl=0)
+    cache.put("break", (BREAK,), complete=True)
+
+    assert cache.get("break") is None
+    assert cache.get("break p") is None
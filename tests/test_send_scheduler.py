@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from send_scheduler import BULK, INTERACTIVE, OutboundScheduler, bot_key
+
+TOKEN = "123456789:AAbenchmarkbenchmarkbenchmarkbench00"
+
+
+def test_bot_key_is_numeric_id_from_token():
+    assert bot_key(TOKEN) == "123456789"
+    assert bot_key(None) == ""
+
+
+def test_interactive_sends_go_before_bulk():
+    async def scenario():
+        scheduler = OutboundScheduler(global_rate=1000, private_rate=1000, chat_burst=1000)
+        order = []
+
+        def call(name):
+            async def send():
+                order.append(name)
+            return send
+
+        # Все отправки ставятся в очередь до первого шага планировщика
+        sends = [
+            scheduler.submit("1", 1, call("bulk-1"), BULK),
+            scheduler.submit("1", 2, call("bulk-2"), BULK),
+            scheduler.submit("1", 3, call("reply"), INTERACTIVE),
+        ]
+        await asyncio.gather(*sends)
+        return order
+
+    assert asyncio.run(scenario()) == ["reply", "bulk-1", "bulk-2"]
+
+
+def test_retry_after_is_retried():
+    class Flood(Exception):
+        retry_after = 0.01
+
+    async def scenario():
+        scheduler = OutboundScheduler()
+        attempts = []
+
+        async def send():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise Flood()
+            return "ok"
+
+        result = await scheduler.submit("1", 1, send)
+        return result, len(attempts), scheduler.retried
+
+    assert asyncio.run(scenario()) == ("ok", 2, 1)
+
+
+def test_ptb_and_aiogram_adapters_share_one_bucket_per_token():
+    pytest.importorskip("telegram")
+    pytest.importorskip("aiogram")
+    from aiogram import Bot
+    from aiogram.methods import SendMessage
+
+    from aiogram_rate_limiter import AiogramRateLimitMiddleware
+    from ptb_rate_limiter import PTBRateLimiter
+
+    async def scenario():
+        scheduler = OutboundScheduler()
+        ptb_limiter = PTBRateLimiter(bot_key(TOKEN), scheduler)
+        middleware = AiogramRateLimitMiddleware(scheduler)
+        bot = Bot(token=TOKEN)
+
+        async def ptb_callback():
+            return "ptb"
+
+        async def make_request(bot, method):
+            return "aiogram"
+
+        ptb_result = await ptb_limiter.process_request(
+            ptb_callback, (), {}, "sendMessage", {"chat_id": 1, "text": "x"}, None
+        )
+        aiogram_result = await middleware(make_request, bot, SendMessage(chat_id=2, text="x"))
+        await bot.session.close()
+        return ptb_result, aiogram_result, set(scheduler._global_buckets)
+
+    assert asyncio.run(scenario()) == ("ptb", "aiogram", {"123456789"})
+
+
+def test_cancelled_sends_do_not_use_rate_budget():
+    async def scenario():
+        scheduler = OutboundScheduler(global_rate=1000, private_rate=1000, chat_burst=1)
+        sent = []
+
+        def call(name):
+            async def send():
+                sent.append(name)
+            return send
+
+        abandoned = asyncio.ensure_future(scheduler.submit("1", 1, call("abandoned")))
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        await scheduler.submit("1", 1, call("kept"))
+        return sent, scheduler.dropped, scheduler._chat_bucket("1", 1).tokens
+
+    sent, dropped, tokens = asyncio.run(scenario())
+    assert sent == ["kept"]
+    assert dropped == 1
+    # Из одного токена корзины чата израсходован только один — на отправленное сообщение
+    assert tokens < 1
+
+
+def test_slow_chat_does_not_hold_back_other_chats():
+    async def scenario():
+        scheduler = OutboundScheduler(global_rate=1000, private_rate=5, chat_burst=1)
+        order = []
+
+        def call(name):
+            async def send():
+                order.append(name)
+            return send
+
+        sends = [scheduler.submit("1", 1, call(f"slow-{i}")) for i in range(3)]
+        sends += [scheduler.submit("1", chat_id, call(f"chat-{chat_id}")) for chat_id in range(2, 6)]
+        await asyncio.gather(*sends)
+        return order
+
+    order = asyncio.run(scenario())
+    assert order[:5] == ["slow-0", "chat-2", "chat-3", "chat-4", "chat-5"]
+    assert order[5:] == ["slow-1", "slow-2"]
+
+
+def test_messages_of_one_chat_keep_their_order():
+    async def scenario():
+        scheduler = OutboundScheduler(global_rate=3, private_rate=1000, chat_burst=1000)
+        order = []
+
+        def call(name):
+            async def send():
+                order.append(name)
+            return send
+
+        await asyncio.gather(*(scheduler.submit("1", 1 + i % 2, call(i)) for i in range(6)))
+        return order, scheduler.queue_depth
+
+    order, depth = asyncio.run(scenario())
+    assert [i for i in order if i % 2 == 0] == [0, 2, 4]
+    assert [i for i in order if i % 2 == 1] == [1, 3, 5]
+    assert depth == 0
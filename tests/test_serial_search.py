@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("telegram")
+
+import serial_poisk
+from series_record import Series
+
+
+def doc(series_id, name):
+    return {"id": series_id, "name": name, "year": 2000}
+
+
+class FakeCatalog:
+    def __init__(self, docs, confident):
+        self.docs = docs
+        self.confident = confident
+
+    def search(self, query, limit):
+        return self.docs[:limit], self.confident
+
+
+@pytest.fixture
+def api(monkeypatch):
+    calls = []
+
+    async def fetch_search_page(query, page=1, limit=serial_poisk.SEARCH_PAGE_SIZE):
+        calls.append(page)
+        start = (page - 1) * limit
+        return tuple(Series.from_doc(doc(i, f"api {i}")) for i in range(start, start + limit)), 5
+
+    monkeypatch.setattr(serial_poisk, "fetch_search_page", fetch_search_page)
+    monkeypatch.setattr(serial_poisk, "kinopoisk_cache", serial_poisk.ResponseCache())
+    return calls
+
+
+def full_catalog():
+    return FakeCatalog([doc(i, f"local {i}") for i in range(100, 105)], True)
+
+
+def test_full_local_page_skips_api(monkeypatch, api):
+    monkeypatch.setattr(serial_poisk, "catalog", full_catalog())
+
+    source, results, pages = asyncio.run(serial_poisk.search_series_page("local"))
+
+    assert source == serial_poisk.LOCAL_SOURCE
+    assert [series.name for series in results] == [f"local {i}" for i in range(100, 105)]
+    assert pages == 1
+    assert serial_poisk.next_api_page(source, 1, results, pages) == 1
+    assert api == []
+
+
+def test_partial_local_page_falls_back_to_api(monkeypatch, api):
+    monkeypatch.setattr(serial_poisk, "catalog", FakeCatalog([doc(1, "local 1")], False))
+
+    source, results, pages = asyncio.run(serial_poisk.search_series_page("api"))
+
+    assert source == serial_poisk.API_SOURCE
+    assert results[0].name == "api 0"
+    assert pages == 5
+    assert api == [1]
+
+
+def test_api_cursor_skips_catalog(monkeypatch, api):
+    monkeypatch.setattr(serial_poisk, "catalog", full_catalog())
+
+    source, results, _ = asyncio.run(serial_poisk.search_series_page("api", serial_poisk.API_SOURCE, 3))
+
+    assert source == serial_poisk.API_SOURCE
+    assert results[0].name == "api 10"
+    assert api == [3]
+
+
+def test_api_error_returns_partial_local_results_without_next_page(monkeypatch):
+    async def fetch_search_page(query, page=1, limit=serial_poisk.SEARCH_PAGE_SIZE):
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(serial_poisk, "fetch_search_page", fetch_search_page)
+    monkeypatch.setattr(serial_poisk, "catalog", FakeCatalog([doc(1, "local 1")], False))
+
+    source, results, pages = asyncio.run(serial_poisk.search_series_page("local"))
+
+    assert source == serial_poisk.LOCAL_SOURCE
+    assert [series.id for series in results] == [1]
+    assert serial_poisk.next_api_page(source, 1, results, pages) is None
+
+
+def test_pages_after_local_page_cover_every_api_page(monkeypatch, api):
+    monkeypatch.setattr(serial_poisk, "catalog", full_catalog())
+
+    async def collect():
+        return [(source, page, results) async for source, page, results, _ in serial_poisk.iter_search_pages("q")]
+
+    pages = asyncio.run(collect())
+
+    assert [(source, page) for source, page, _ in pages] == [("l", 1), ("a", 1), ("a", 2), ("a", 3), ("a", 4), ("a", 5)]
+    assert [series.id for _, _, results in pages[1:] for series in results] == list(range(25))
+
+
+def navigation_data(keyboard):
+    return [button.callback_data for button in keyboard.inline_keyboard[-1]]
+
+
+def test_navigation_buttons_keep_the_page_source():
+    local = tuple(Series.from_doc(doc(i, f"local {i}")) for i in range(5))
+    api_page = tuple(Series.from_doc(doc(i, f"api {i}")) for i in range(5))
+
+    _, keyboard = serial_poisk.render_search_page("q", "l", 1, local, 1)
+    assert navigation_data(keyboard) == ["search:a1"]
+    _, keyboard = serial_poisk.render_search_page("q", "a", 1, api_page, 3, after_local=True)
+    assert navigation_data(keyboard) == ["search:l1", "search:a2"]
+    _, keyboard = serial_poisk.render_search_page("q", "a", 3, api_page, 3)
+    assert navigation_data(keyboard) == ["search:a2"]
+
+
+def test_parse_search_cursor_accepts_old_page_numbers():
+    assert serial_poisk.parse_search_cursor("search:l1") == ("l", 1)
+    assert serial_poisk.parse_search_cursor("search:a12") == ("a", 12)
+    assert serial_poisk.parse_search_cursor("search:3") == ("a", 3)
+
+
+def test_inline_local_results_are_not_complete(monkeypatch, api):
+    monkeypatch.setattr(serial_poisk, "inline_cache", serial_poisk.PrefixResultCache())
+    monkeypatch.setattr(serial_poisk, "INLINE_RESULTS_LIMIT", 2)
+    monkeypatch.setattr(serial_poisk, "catalog", FakeCatalog([doc(1, "break 1"), doc(2, "break 2")], True))
+
+    asyncio.run(serial_poisk.inline_search("break"))
+
+    assert serial_poisk.inline_cache.get("breaking") is None
+    assert api == []
+
+
+def test_inline_complete_api_result_serves_longer_queries(monkeypatch):
+    async def fetch_search_page(query, page=1, limit=serial_poisk.SEARCH_PAGE_SIZE):
+        return (Series.from_doc({"id": 1, "name": "Во все тяжкие", "alternativeName": "Breaking Bad"}),), 1
+
+    monkeypatch.setattr(serial_poisk, "fetch_search_page", fetch_search_page)
+    monkeypatch.setattr(serial_poisk, "inline_cache", serial_poisk.PrefixResultCache())
+    monkeypatch.setattr(serial_poisk, "catalog", FakeCatalog([], False))
+
+    asyncio.run(serial_poisk.inline_search("break"))
+
+    assert [series.id for series in serial_poisk.inline_cache.get("breaking")] == [1]
@@ -0,0 +1,58 @@
+from series_catalog import SeriesCatalog
+
+
+def make_doc(series_id, name, alternative_name=None, votes=100):
+    return {
+        "id": series_id,
+        "name": name,
+        "alternativeName": alternative_name,
+        "type": "tv-series",
+        "year": 2010,
+        "rating": {"kp": 8.0},
+        "votes": {"kp": votes},
+        "genres": [{"name": "драма"}],
+    }
+
+
+def test_prefix_search_by_any_name(tmp_path):
+    catalog = SeriesCatalog(str(tmp_path / "catalog.db"))
+    catalog.upsert_many([make_doc(1, "Во все тяжкие", "Breaking Bad"), make_doc(2, "Лучше звоните Солу")])
+
+    docs, _ = catalog.search("break")
+    assert [doc["id"] for doc in docs] == [1]
+    docs, _ = catalog.search("тяжк")
+    assert [doc["id"] for doc in docs] == [1]
+    catalog.close()
+
+
+def test_single_exact_match_is_not_confident(tmp_path):
+    catalog = SeriesCatalog(str(tmp_path / "catalog.db"))
+    catalog.upsert_many([make_doc(1, "Во все тяжкие", "Breaking Bad")])
+
+    docs, confident = catalog.search("Breaking Bad", limit=5)
+    assert [doc["id"] for doc in docs] == [1]
+    assert not confident
+    catalog.close()
+
+
+def test_full_page_is_confident(tmp_path):
+    catalog = SeriesCatalog(str(tmp_path / "catalog.db"))
+    catalog.upsert_many([make_doc(i, f"Доктор {i}", votes=i) for i in range(1, 8)])
+
+    docs, confident = catalog.search("доктор", limit=5)
+    assert len(docs) == 5
+    assert confident
+    # При равной релевантности выше сериалы с большим числом голосов
+    assert [doc["id"] for doc in docs] == [7, 6, 5, 4, 3]
+    catalog.close()
+
+
+def test_short_document_does_not_replace_full(tmp_path):
+    catalog = SeriesCatalog(str(tmp_path / "catalog.db"))
+    full = dict(make_doc(1, "Шерлок"), persons=[{"name": "Бенедикт Камбербэтч", "enProfession": "actor"}])
+    catalog.upsert_many([full])
+    catalog.upsert_many([make_doc(1, "Шерлок")])
+
+    docs, _ = catalog.search("шерлок")
+    assert docs[0]["persons"] == full["persons"]
+    catalog.close()
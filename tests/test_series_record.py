@@ -0,0 +1,49 @@
+import json
+
+from series_record import Series, series_from_docs
+
+DOC = {
+    "id": 404900,
+    "name": "Во все тяжкие",
+    "alternativeName": "Breaking Bad",
+    "enName": None,
+    "year": 2008,
+    "rating": {"kp": 8.9},
+    "genres": [{"name": "драма"}, {"name": "криминал"}, {"name": "триллер"}, {"name": "детектив"}],
+    "poster": {"url": "https://image/poster.jpg"},
+    "persons": [
+        {"name": "Винс Гиллиган", "enProfession": "director"},
+        {"name": "Брайан Крэнстон", "enProfession": "actor"},
+        {"name": "Аарон Пол", "enProfession": "actor"},
+        {"name": "Анна Ганн", "enProfession": "actor"},
+        {"name": "Дин Норрис", "enProfession": "actor"},
+    ],
+}
+
+
+def test_from_doc_keeps_names_and_trims_lists():
+    series = Series.from_doc(DOC)
+    assert series.name == "Во все тяжкие"
+    assert series.alternative_name == "Breaking Bad"
+    assert series.en_name == ""
+    assert series.genres == ("драма", "криминал", "триллер")
+    assert series.actors == ("Брайан Крэнстон", "Аарон Пол", "Анна Ганн")
+    assert series.rating == 8.9
+
+
+def test_json_round_trip():
+    series = Series.from_doc(DOC)
+    assert Series.from_json(json.loads(json.dumps(series))) == series
+
+
+def test_old_snapshot_without_alternative_names():
+    old = [1, "Шерлок", 2010, 8.7, ["драма"], "", ["Бенедикт Камбербэтч"]]
+    series = Series.from_json(old)
+    assert series.name == "Шерлок"
+    assert series.alternative_name == ""
+    assert series.actors == ("Бенедикт Камбербэтч",)
+
+
+def test_series_from_docs():
+    assert [series.id for series in series_from_docs({"docs": [DOC, {"id": 1}]})] == [404900, 1]
+    assert series_from_docs(None) == ()
@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("telegram")
+
+from sqlite_persistence import SQLitePersistence
+
+
+def open_store(tmp_path):
+    return SQLitePersistence(str(tmp_path / "state.db"), batch_delay=0.01)
+
+
+def test_user_chat_and_bot_data_survive_reopen(tmp_path):
+    async def write():
+        store = open_store(tmp_path)
+        await store.update_user_data(1, {"awaiting_search": True})
+        await store.update_chat_data(-100, {"lang": "ru"})
+        await store.update_bot_data({"started": 3})
+        await store.flush()
+
+    async def read():
+        store = open_store(tmp_path)
+        # При запуске данные пользователей и чатов не загружаются
+        assert await store.get_user_data() == {}
+        assert await store.get_chat_data() == {}
+        user_data, chat_data = {}, {}
+        await store.refresh_user_data(1, user_data)
+        await store.refresh_chat_data(-100, chat_data)
+        bot_data = await store.get_bot_data()
+        await store.flush()
+        return user_data, chat_data, bot_data
+
+    asyncio.run(write())
+    assert asyncio.run(read()) == ({"awaiting_search": True}, {"lang": "ru"}, {"started": 3})
+
+
+def test_dropped_user_data_is_deleted(tmp_path):
+    async def write():
+        store = open_store(tmp_path)
+        await store.update_user_data(1, {"awaiting_search": True})
+        await store.update_user_data(2, {"awaiting_search": False})
+        await store.flush()
+        store = open_store(tmp_path)
+        await store.drop_user_data(1)
+        await store.flush()
+
+    async def read(user_id):
+        store = open_store(tmp_path)
+        user_data = {}
+        await store.refresh_user_data(user_id, user_data)
+        await store.flush()
+        return user_data
+
+    asyncio.run(write())
+    assert asyncio.run(read(1)) == {}
+    assert asyncio.run(read(2)) == {"awaiting_search": False}
+
+
+def test_refresh_reads_once_and_keeps_newer_values(tmp_path):
+    async def run():
+        store = open_store(tmp_path)
+        await store.update_user_data(1, {"step": 1, "name": "stored"})
+        await store.flush()
+
+        store = open_store(tmp_path)
+        user_data = {"step": 2}
+        await store.refresh_user_data(1, user_data)
+        first = dict(user_data)
+        user_data.clear()
+        await store.refresh_user_data(1, user_data)
+        await store.flush()
+        return first, user_data
+
+    first, second = asyncio.run(run())
+    assert first == {"step": 2, "name": "stored"}
+    assert second == {}
+
+
+def test_pending_writes_are_visible_before_flush(tmp_path):
+    async def run():
+        store = open_store(tmp_path)
+        await store.update_bot_data({"counter": 1})
+        await store.update_conversation("search", (1, 1), "WAITING")
+        bot_data = await store.get_bot_data()
+        conversations = await store.get_conversations("search")
+        written = store.writes
+        await store.flush()
+        return bot_data, conversations, written
+
+    bot_data, conversations, written = asyncio.run(run())
+    assert bot_data == {"counter": 1}
+    assert conversations == {(1, 1): "WAITING"}
+    assert written == 0
+
+
+def test_conversations_update_and_delete(tmp_path):
+    async def write():
+        store = open_store(tmp_path)
+        await store.update_conversation("search", (1, 1), "WAITING")
+        await store.update_conversation("search", (2, 2), "DONE")
+        await store.update_conversation("other", (1, 1), 5)
+        await store.flush()
+        store = open_store(tmp_path)
+        await store.update_conversation("search", (2, 2), None)
+        await store.update_conversation("search", (1, 1), "CONFIRM")
+        await store.flush()
+
+    async def read():
+        store = open_store(tmp_path)
+        result = await store.get_conversations("search"), await store.get_conversations("other")
+        await store.flush()
+        return result
+
+    asyncio.run(write())
+    assert asyncio.run(read()) == ({(1, 1): "CONFIRM"}, {(1, 1): 5})
+
+
+def test_unchanged_data_is_not_rewritten(tmp_path):
+    async def run():
+        store = open_store(tmp_path)
+        await store.update_bot_data({"started": 1})
+        await store.update_user_data(1, {"awaiting_search": True})
+        await asyncio.sleep(0.05)
+        batches = store.batches
+        # Очередной шаг update_interval PTB с теми же данными
+        await store.update_bot_data({"started": 1})
+        await store.update_user_data(1, {"awaiting_search": True})
+        await asyncio.sleep(0.05)
+        unchanged = store.batches
+        await store.update_bot_data({"started": 2})
+        await asyncio.sleep(0.05)
+        changed = store.batches
+        await store.flush()
+        return batches, unchanged, changed
+
+    batches, unchanged, changed = asyncio.run(run())
+    assert batches == 1
+    assert unchanged == batches
+    assert changed == batches + 1
+
+
+def test_data_read_from_database_is_not_rewritten_unchanged(tmp_path):
+    async def run():
+        store = open_store(tmp_path)
+        await store.update_bot_data({"started": 1})
+        await store.flush()
+
+        store = open_store(tmp_path)
+        bot_data = await store.get_bot_data()
+        await store.update_bot_data(bot_data)
+        await store.drop_user_data(42)
+        await store.drop_user_data(42)
+        await asyncio.sleep(0.05)
+        writes = store.writes
+        await store.flush()
+        return writes
+
+    # Записано только первое удаление отсутствующего пользователя
+    assert asyncio.run(run()) == 1
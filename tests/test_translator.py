@@ -0,0 +1,133 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from translator import GoogleBackend, TranslationService
+
+
+class TaggingBackend:
+    """Перевод, по которому видно, какому тексту принадлежит результат."""
+
+    def __init__(self):
+        self.batches = []
+
+    def translate_batch(self, texts: list, target: str) -> list:
+        self.batches.append(list(texts))
+        return [f"[{target}] {text.upper()}" for text in texts]
+
+
+class ShortBackend:
+    def translate_batch(self, texts: list, target: str) -> list:
+        return [text.upper() for text in texts[:-1]]
+
+
+def make_service(tmp_path, backend):
+    return TranslationService(backend=backend, db_path=str(tmp_path / "translations.db"), batch_window=0.05)
+
+
+def test_multiline_texts_in_one_batch_reach_their_senders(tmp_path):
+    backend = TaggingBackend()
+    texts = ["привет\nкак дела", "одна строка", "первая\n\nвторая\nтретья", "ещё одна"]
+
+    async def scenario():
+        service = make_service(tmp_path, backend)
+        results = await asyncio.gather(*(service.translate(text) for text in texts))
+        service.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(backend.batches) == 1
+    assert results == [
+        "[en] ПРИВЕТ\nКАК ДЕЛА",
+        "[en] ОДНА СТРОКА",
+        "[en] ПЕРВАЯ\nВТОРАЯ\nТРЕТЬЯ",
+        "[en] ЕЩЁ ОДНА",
+    ]
+
+
+def test_identical_texts_are_translated_once(tmp_path):
+    backend = TaggingBackend()
+
+    async def scenario():
+        service = make_service(tmp_path, backend)
+        results = await asyncio.gather(service.translate("кот"), service.translate("  кот "))
+        cached = await service.translate("кот")
+        service.close()
+        return results, cached
+
+    results, cached = asyncio.run(scenario())
+    assert backend.batches == [["кот"]]
+    assert results == ["[en] КОТ", "[en] КОТ"]
+    assert cached == "[en] КОТ"
+
+
+def test_result_count_mismatch_fails_the_whole_batch(tmp_path):
+    async def scenario():
+        service = make_service(tmp_path, ShortBackend())
+        results = await asyncio.gather(
+            service.translate("первый"), service.translate("второй"), return_exceptions=True
+        )
+        stored = service._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        service.close()
+        return results, stored
+
+    results, stored = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert stored == 0
+
+
+def fake_google(monkeypatch, translate):
+    requests = []
+
+    class FakeGoogleTranslator:
+        def __init__(self, source, target):
+            self.target = target
+
+        def translate(self, text):
+            requests.append(text)
+            return translate(text)
+
+    monkeypatch.setitem(sys.modules, "deep_translator", SimpleNamespace(GoogleTranslator=FakeGoogleTranslator))
+    return requests
+
+
+def test_google_backend_sends_one_request_per_batch(monkeypatch):
+    requests = fake_google(monkeypatch, str.upper)
+    texts = ["a\nb", "c", "d\ne\nf"]
+
+    backend = GoogleBackend()
+    assert backend.translate_batch(texts, "en") == ["A\nB", "C", "D\nE\nF"]
+    backend.close()
+    assert len(requests) == 1
+
+
+def test_google_backend_falls_back_to_single_texts_when_separator_is_lost(monkeypatch):
+    requests = fake_google(monkeypatch, lambda text: text.replace("@@@", "").upper())
+    texts = ["a", "b", "c"]
+
+    backend = GoogleBackend()
+    assert backend.translate_batch(texts, "en") == ["A", "B", "C"]
+    backend.close()
+    assert sorted(requests[1:]) == texts
+    assert backend.fallbacks == 1
+
+
+def test_google_backend_does_not_join_texts_containing_the_separator(monkeypatch):
+    requests = fake_google(monkeypatch, str.upper)
+
+    backend = GoogleBackend()
+    assert backend.translate_batch(["a @@@ b", "c"], "en") == ["A @@@ B", "C"]
+    backend.close()
+    assert sorted(requests) == ["a @@@ b", "c"]
+
+
+def test_google_backend_splits_batches_over_the_length_limit(monkeypatch):
+    requests = fake_google(monkeypatch, str.upper)
+    texts = ["x" * 30, "y" * 30, "z" * 30]
+
+    backend = GoogleBackend(max_chars=70)
+    assert backend.translate_batch(texts, "en") == [text.upper() for text in texts]
+    backend.close()
+    assert len(requests) == 2
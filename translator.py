@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "google")
+TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", 4))
+TRANSLATION_BATCH_WINDOW = float(os.getenv("TRANSLATION_BATCH_WINDOW", 0.05))
+TRANSLATION_MAX_BATCH = int(os.getenv("TRANSLATION_MAX_BATCH", 20))
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", 4096))
+# Лимит длины одного запроса к Google Translate в deep_translator
+GOOGLE_MAX_CHARS = 4500
+# Сколько запросов к Google выполняется одновременно, если пакет переводится по одному тексту
+GOOGLE_PARALLEL_REQUESTS = int(os.getenv("GOOGLE_PARALLEL_REQUESTS", 4))
+# Разделитель текстов в общем запросе: знаки без слов переводчик оставляет как есть
+GOOGLE_SEPARATOR = "\n@@@\n"
+_SEPARATOR_RE = re.compile(r"\s*@@@\s*")
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+# Частые служебные слова английского языка для локальной проверки языка
+ENGLISH_WORDS = frozenset("""
+a about after all also an and any are as at be because been but by can could do does did for from
+get got had has have he her him his how i if in into is it its just me my no not now of on one or
+our out she so some than that the their them then there these they this to too up us was we were
+what when where which who why will with would you your yes hello hi thanks please ok okay
+""".split())
+
+
+# Нормализация текста для ключа кэша: без пробелов по краям и повторных пробелов, переносы строк сохраняются
+def normalize_text(text: str) -> str:
+    return "\n".join(" ".join(line.split()) for line in text.strip().splitlines() if line.strip())
+
+
+# Локальная проверка, что текст уже на английском: только латиница и заметная доля служебных слов.
+# Текст без букв (числа, эмодзи) переводить тоже не нужно.
+def looks_english(text: str) -> bool:
+    letters = [c for c in text if c.isalpha()]
+    if not letters:
+        return True
+    if any(not ("a" <= c.lower() <= "z") for c in letters):
+        return False
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return False
+    common = sum(word in ENGLISH_WORDS for word in words)
+    return common / len(words) >= 0.25
+
+
+class GoogleBackend:
+    """Перевод через deep_translator.GoogleTranslator.
+
+    Тексты пакета склеиваются через строку-разделитель и переводятся одним запросом.
+    Ответ делится по разделителю; если частей не столько же, сколько текстов
+    (сервис изменил разделитель или он встретился в тексте), эти тексты переводятся
+    по одному — параллельно в собственном пуле потоков.
+    """
+
+    def __init__(self, max_chars: int = GOOGLE_MAX_CHARS, parallel: int = GOOGLE_PARALLEL_REQUESTS):
+        self.max_chars = max_chars
+        self._pool = ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="google")
+        self.fallbacks = 0
+
+    @staticmethod
+    def _translate_one(text: str, target: str) -> str:
+        from deep_translator import GoogleTranslator
+
+        # Свой экземпляр на запрос: GoogleTranslator хранит параметры запроса в атрибутах
+        return GoogleTranslator(source="auto", target=target).translate(text)
+
+    # Один запрос на группу; None, если ответ не делится на нужное число частей
+    def _translate_joined(self, group: list, target: str):
+        if len(group) == 1:
+            return [self._translate_one(group[0], target)]
+        if any(GOOGLE_SEPARATOR.strip() in text for text in group):
+            return None
+        translated = self._translate_one(GOOGLE_SEPARATOR.join(group), target) or ""
+        parts = _SEPARATOR_RE.split(translated.strip())
+        return parts if len(parts) == len(group) else None
+
+    # Группы текстов, суммарная длина которых укладывается в лимит одного запроса
+    def _groups(self, texts: list) -> list:
+        groups, group, length = [], [], 0
+        for text in texts:
+            if group and length + len(text) + len(GOOGLE_SEPARATOR) > self.max_chars:
+                groups.append(group)
+                group, length = [], 0
+            group.append(text)
+            length += len(text) + len(GOOGLE_SEPARATOR)
+        if group:
+            groups.append(group)
+        return groups
+
+    def translate_batch(self, texts: list, target: str) -> list:
+        groups = self._groups(list(texts))
+        joined = list(self._pool.map(lambda group: self._translate_joined(group, target), groups))
+        retry = [text for group, parts in zip(groups, joined) if parts is None for text in group]
+        if retry:
+            self.fallbacks += 1
+            logger.warning(f"Ответ на пакет не разделился по текстам, {len(retry)} текстов переводятся по одному")
+        retried = iter(self._pool.map(lambda text: self._translate_one(text, target), retry))
+        results = []
+        for group, parts in zip(groups, joined):
+            results.extend(parts if parts is not None else [next(retried) for _ in group])
+        return results
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class EchoBackend:
+    """Локальная замена для тестов и разработки: возвращает текст без изменений."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def translate_batch(self, texts: list, target: str) -> list:
+        self.calls += 1
+        return list(texts)
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "echo": EchoBackend,
+}
+
+
+class TranslationService:
+    """Сервис перевода для aiogram-ботов.
+
+    Блокирующие запросы выполняются в ограниченном пуле потоков, результаты кэшируются
+    в памяти (LRU) и в SQLite. Сообщения, пришедшие в пределах batch_window,
+    передаются бэкенду одним пакетом.
+    """
+
+    def __init__(self, backend=None, db_path: str = "translations.db", cache_size: int = TRANSLATION_CACHE_SIZE,
+                 max_workers: int = TRANSLATION_WORKERS, batch_window: float = TRANSLATION_BATCH_WINDOW,
+                 max_batch: int = TRANSLATION_MAX_BATCH):
+        self.backend = backend or BACKENDS[TRANSLATION_BACKEND]()
+        self.cache_size = cache_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._cache = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translate")
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS translations (
+                    target TEXT NOT NULL,
+                    source_text TEXT NOT NULL,
+                    translated TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (target, source_text)
+                ) WITHOUT ROWID
+                """
+            )
+        # Собираемые пакеты: язык -> {нормализованный текст: [futures]}
+        self._pending = {}
+        self._flush_handles = {}
+        # Ссылки на выполняющиеся пакеты: задачу без ссылок может удалить сборщик мусора
+        self._tasks = set()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.skipped = 0
+        self.upstream_calls = 0
+
+    def is_english(self, text: str) -> bool:
+        return looks_english(normalize_text(text))
+
+    async def translate(self, text: str, target: str = "en") -> str:
+        normalized = normalize_text(text)
+        if not normalized or (target == "en" and looks_english(normalized)):
+            self.skipped += 1
+            return text
+
+        key = (target, normalized)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.memory_hits += 1
+            return cached
+
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(target, {})
+        batch.setdefault(normalized, []).append(future)
+        if len(batch) >= self.max_batch:
+            self._flush(target)
+        elif target not in self._flush_handles:
+            self._flush_handles[target] = asyncio.get_running_loop().call_later(
+                self.batch_window, self._flush, target
+            )
+        return await future
+
+    def _flush(self, target: str) -> None:
+        handle = self._flush_handles.pop(target, None)
+        if handle is not None:
+            handle.cancel()
+        batch = self._pending.pop(target, None)
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(target, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, target: str, batch: dict) -> None:
+        texts = list(batch)
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self._executor, self._translate_blocking, texts, target)
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for text, translated in zip(texts, results):
+            self._remember((target, text), translated)
+            for future in batch[text]:
+                if not future.done():
+                    future.set_result(translated)
+
+    # Выполняется в пуле потоков: сначала SQLite, затем один запрос к бэкенду для промахов
+    def _translate_blocking(self, texts: list, target: str) -> list:
+        placeholders = ", ".join("?" for _ in texts)
+        with self._db_lock:
+            stored = dict(self._conn.execute(
+                f"SELECT source_text, translated FROM translations WHERE target = ? AND source_text IN ({placeholders})",
+                [target, *texts],
+            ).fetchall())
+        self.db_hits += len(stored)
+
+        missing = [text for text in texts if text not in stored]
+        if missing:
+            self.upstream_calls += 1
+            translated = self.backend.translate_batch(missing, target)
+            # Результаты раздаются по позиции: при несовпадении числа ни один не отдается
+            if len(translated) != len(missing):
+                raise RuntimeError(f"Бэкенд перевода вернул {len(translated)} результатов вместо {len(missing)}")
+            now = time.time()
+            with self._db_lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO translations (target, source_text, translated, created_at) VALUES (?, ?, ?, ?)",
+                    [(target, text, value, now) for text, value in zip(missing, translated)],
+                )
+            stored.update(zip(missing, translated))
+        return [stored[text] for text in texts]
+
+    def _remember(self, key, value: str) -> None:
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "skipped": self.skipped,
+            "upstream_calls": self.upstream_calls,
+            "cached": len(self._cache),
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        backend_close = getattr(self.backend, "close", None)
+        if backend_close is not None:
+            backend_close()
+        self._conn.close()
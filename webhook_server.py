@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sys
+
+from aiohttp import web
+
+from bot_routes import load_route, unique_routes
+
+logger = logging.getLogger(__name__)
+
+# Публичный HTTPS-адрес, на который Telegram отправляет обновления (например, https://bots.example.com)
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+# Секрет сервера для вычисления путей и токенов webhook; без него используются токены ботов
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+# Боты для webhook-сервера по умолчанию (имена модулей через запятую)
+WEBHOOK_BOTS = os.getenv("WEBHOOK_BOTS", "serial_poisk,main_bot,cats,nasa,dz1,dz2,dz3")
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+# Путь и секретный токен webhook выводятся из токена бота: одинаковы между перезапусками и не раскрывают токен
+def derive_secret(bot_token: str, purpose: str) -> str:
+    key = (WEBHOOK_SECRET or bot_token).encode()
+    return hmac.new(key, f"{purpose}:{bot_token}".encode(), hashlib.sha256).hexdigest()
+
+
+class WebhookServer:
+    """Один HTTP-сервер для webhook всех ботов.
+
+    Обновление направляется боту по секретной части пути (поиск в словаре),
+    заголовок X-Telegram-Bot-Api-Secret-Token сверяется за постоянное время,
+    тело запроса разбирается json.loads прямо из байтов.
+    """
+
+    def __init__(self, routes, base_url: str = WEBHOOK_BASE_URL, host: str = WEBHOOK_HOST, port: int = WEBHOOK_PORT):
+        self.base_url = base_url.rstrip("/")
+        self.host = host
+        self.port = port
+        self.routes = unique_routes(routes)
+        self._by_path = {
+            derive_secret(route.token, "path")[:32]: (route, derive_secret(route.token, "token"))
+            for route in self.routes
+        }
+        self._runner = None
+        self.received = 0
+        self.rejected = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        entry = self._by_path.get(request.match_info["path"])
+        if entry is None:
+            self.rejected += 1
+            return web.Response(status=404)
+        route, secret = entry
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            self.rejected += 1
+            return web.Response(status=403)
+        try:
+            data = json.loads(await request.read())
+        except ValueError:
+            self.rejected += 1
+            return web.Response(status=400)
+
+        self.received += 1
+        # Ответ сразу после постановки в обработку: Telegram не ждет выполнения обработчиков
+        await route.feed(data)
+        return web.Response()
+
+    async def start(self) -> None:
+        if not self.base_url:
+            raise RuntimeError("Не задан WEBHOOK_BASE_URL")
+        for route in self.routes:
+            await route.start()
+
+        app = web.Application()
+        app.router.add_post("/tg/{path}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Webhook-сервер слушает {self.host}:{self.port}")
+
+        for path, (route, secret) in self._by_path.items():
+            await route.set_webhook(f"{self.base_url}/tg/{path}", secret)
+            logger.info(f"Webhook установлен для {route.name}")
+
+    # Webhook у Telegram не удаляется: обновления, пришедшие во время перезапуска, будут доставлены позже
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        for route in self.routes:
+            try:
+                await route.stop()
+            except Exception as e:
+                logger.warning(f"Ошибка при остановке {route.name}: {e}")
+
+
+async def serve(names) -> None:
+    server = WebhookServer([load_route(name) for name in names])
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    # Запуск: python webhook_server.py [serial_poisk cats ...]
+    # Для возврата к polling достаточно запустить сам скрипт бота: он удалит webhook.
+    logging.basicConfig(level=logging.INFO)
+    bot_names = sys.argv[1:] or [name.strip() for name in WEBHOOK_BOTS.split(",") if name.strip()]
+    try:
+        asyncio.run(serve(bot_names))
+    except KeyboardInterrupt:
+        pass